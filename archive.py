@@ -0,0 +1,163 @@
+import gzip
+import hashlib
+import logging
+import mmap
+import os
+import sqlite3
+import threading
+from collections import namedtuple
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError: # Windows: basta el cerrojo entre hilos
+    fcntl = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ArchivedPage = namedtuple("ArchivedPage", ["url", "digest", "encoding", "source", "fetched_at"])
+
+def _compress(content):
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=10).compress(content)
+    return "gzip", gzip.compress(content, compresslevel=6, mtime=0)
+
+def _decompress(codec, data):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("El archivo contiene páginas en zstd y el paquete 'zstandard' no está instalado.")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+class HtmlArchive:
+    """Archivo local del HTML descargado, direccionado por contenido.
+
+    Cada cuerpo se comprime (zstd si está instalado `zstandard`; si no, gzip) y se añade
+    a un único fichero `pages.pack`; un cuerpo idéntico solo se guarda una vez aunque
+    llegue de varios enlaces o descargas. El índice SQLite relaciona cada `(url, sha256)`
+    con su posición en el paquete y la fecha de descarga. Las lecturas usan mmap, así
+    que recorrer un archivo grande no lo carga en memoria.
+
+    Se puede leer desde varios procesos a la vez; las escrituras se serializan con un
+    cerrojo sobre el paquete.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or os.environ.get("HTML_ARCHIVE_DIR", ".cache/archive")
+        self.pack_path = os.path.join(self.directory, "pages.pack")
+        self.index_path = os.path.join(self.directory, "index.sqlite")
+        os.makedirs(self.directory, exist_ok=True)
+        self._databases = {} # pid -> (cerrojo, conexión)
+        self._write_lock = threading.Lock()
+        self._map_lock = threading.Lock()
+        self._map = (None, None) # (pid, mmap)
+
+    def _database(self):
+        """Cerrojo y conexión de este proceso.
+
+        Las descargas archivan desde muchos hilos mientras se crean los procesos de
+        análisis con fork. Con una conexión por hilo, el hijo liberaba las de los hilos
+        que no hereda y podía quedarse bloqueado en un mutex de SQLite tomado en el
+        padre. Por eso hay una sola conexión por proceso, que nunca se libera, y la
+        heredada tras un fork no se usa.
+        """
+        database = self._databases.get(os.getpid())
+        if database is None:
+            connection = sqlite3.connect(self.index_path, timeout=30, check_same_thread=False)
+            connection.execute("CREATE TABLE IF NOT EXISTS blobs (digest TEXT PRIMARY KEY, offset INTEGER NOT NULL, length INTEGER NOT NULL, size INTEGER NOT NULL, codec TEXT NOT NULL)")
+            connection.execute("CREATE TABLE IF NOT EXISTS pages (url TEXT NOT NULL, digest TEXT NOT NULL, encoding TEXT, source TEXT, fetched_at TEXT NOT NULL, PRIMARY KEY (url, digest))")
+            connection.execute("CREATE INDEX IF NOT EXISTS pages_fetched_at ON pages (fetched_at)")
+            connection.commit()
+            database = self._databases.setdefault(os.getpid(), (threading.Lock(), connection))
+        return database
+
+    def _append(self, data):
+        """Añade `data` al final del paquete y devuelve su posición."""
+        with self._write_lock, open(self.pack_path, "ab") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        return offset
+
+    def put(self, url, content, encoding=None, source=""):
+        """Guarda el cuerpo descargado de `url`. Devuelve su sha256."""
+        digest = hashlib.sha256(content).hexdigest()
+        lock, connection = self._database()
+        with lock:
+            stored = connection.execute("SELECT 1 FROM blobs WHERE digest = ?", (digest,)).fetchone() is not None
+        if not stored:
+            codec, data = _compress(content)
+            offset = self._append(data)
+            # Si se cae antes de indexarlo, el paquete solo conserva bytes huérfanos
+            with lock, connection:
+                connection.execute("INSERT OR IGNORE INTO blobs VALUES (?, ?, ?, ?, ?)", (digest, offset, len(data), len(content), codec))
+        with lock, connection:
+            connection.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)", (url, digest, encoding, source, datetime.utcnow().isoformat()))
+        return digest
+
+    def _view(self, end):
+        """mmap de solo lectura del paquete que cubre al menos hasta `end`."""
+        with self._map_lock:
+            pid, view = self._map
+            if view is None or pid != os.getpid() or len(view) < end:
+                # El paquete creció: se abre otra vista (la anterior se libera al dejar de usarse)
+                with open(self.pack_path, "rb") as f:
+                    view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._map = (os.getpid(), view)
+            return view
+
+    def read(self, digest):
+        """Devuelve el cuerpo con ese sha256, o None si no está archivado."""
+        lock, connection = self._database()
+        with lock:
+            row = connection.execute("SELECT offset, length, codec FROM blobs WHERE digest = ?", (digest,)).fetchone()
+        if row is None:
+            return None
+        offset, length, codec = row
+        return _decompress(codec, self._view(offset + length)[offset:offset + length])
+
+    def latest(self, url):
+        """Última versión archivada de `url` como `ArchivedPage`, o None."""
+        lock, connection = self._database()
+        with lock:
+            row = connection.execute(
+                "SELECT url, digest, encoding, source, fetched_at FROM pages WHERE url = ? ORDER BY fetched_at DESC LIMIT 1", (url,)
+            ).fetchone()
+        return ArchivedPage(*row) if row else None
+
+    def read_text(self, page):
+        from http_cache import sniff_encoding
+
+        content = self.read(page.digest)
+        if content is None:
+            return None
+        return content.decode(page.encoding or sniff_encoding(content), errors="replace")
+
+_default_archive = None
+
+def get_archive():
+    """Devuelve el archivo HTML del proceso, creándolo la primera vez."""
+    global _default_archive
+    if _default_archive is None:
+        _default_archive = HtmlArchive()
+    return _default_archive
+
+def archive_page(url, content, encoding=None, source=""):
+    """Guarda un cuerpo descargado sin interrumpir la extracción si falla el archivo."""
+    if os.environ.get("HTML_ARCHIVE") == "0":
+        return None
+    try:
+        return get_archive().put(url, content, encoding, source)
+    except (OSError, sqlite3.Error) as e:
+        logging.warning(f"No se pudo archivar el HTML de {url}: {e}")
+        return None
@@ -0,0 +1,52 @@
+"""Compara el análisis del listado con BeautifulSoup frente al análisis por trozos con lxml.
+
+Uso: python benchmarks/bench_listing.py [fixture.html ...] [--repeat N] [--max-items N]
+"""
+import argparse
+import glob
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bs4 import BeautifulSoup
+
+from listing_parser import iter_listing_items
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+def parse_bs4(content, max_items):
+    """El camino anterior de scrape_website: árbol completo con html.parser."""
+    soup = BeautifulSoup(content, "html.parser")
+    items = []
+    for article_container in soup.find_all("article")[:max_items]:
+        title_element = article_container.find("h3", class_="SummaryItemHedBase-hiFYpQ")
+        link_element = article_container.find("a", class_="SummaryItemHedLink-civMjp")
+        if title_element and link_element:
+            items.append((title_element.text.strip(), link_element["href"]))
+    return items
+
+def parse_lxml(content, max_items):
+    return list(iter_listing_items(content, max_items))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("fixtures", nargs="*", default=sorted(glob.glob(os.path.join(FIXTURES_DIR, "*listing*.html"))))
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--max-items", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'fixture':<28}{'bs4 ms':>10}{'lxml ms':>10}{'x':>8}")
+    for path in args.fixtures:
+        with open(path, "rb") as f:
+            content = f.read()
+        if parse_bs4(content, args.max_items) != parse_lxml(content, args.max_items):
+            print(f"{os.path.basename(path)}: los dos analizadores no coinciden")
+            sys.exit(1)
+        bs4_ms = min(timeit.repeat(lambda: parse_bs4(content, args.max_items), number=1, repeat=args.repeat)) * 1000
+        lxml_ms = min(timeit.repeat(lambda: parse_lxml(content, args.max_items), number=1, repeat=args.repeat)) * 1000
+        print(f"{os.path.basename(path):<28}{bs4_ms:>10.2f}{lxml_ms:>10.2f}{bs4_ms / lxml_ms:>8.1f}")
+
+if __name__ == "__main__":
+    main()
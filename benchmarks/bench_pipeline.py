@@ -0,0 +1,505 @@
+"""Mide el pipeline completo sin red: fixtures servidos en local y un PostgREST falso.
+
+Para cada escala (número de artículos del listado) arranca una ejecución en un proceso
+nuevo, con cachés vacías, y muestra artículos/s, latencia p50/p95 por etapa, memoria
+pico (RSS) y peticiones de red al sitio y a la base de datos.
+
+Uso: python benchmarks/bench_pipeline.py [--scales 10 100 1000] [--mode pipeline|extract]
+     [--existing N] [--output resultados.json] [--compare base.json]
+     python benchmarks/bench_pipeline.py --gate [--baseline benchmarks/baseline.json]
+
+Con `--gate` repite las escalas y opciones de la base guardada y termina con código 1
+si el tiempo, las peticiones, la latencia de alguna etapa o la memoria empeoran más
+de lo tolerado. Los artículos y las peticiones se comparan siempre; el tiempo, las
+latencias y la memoria, solo si la base se midió con la misma versión de Python y el
+mismo número de CPU (si no, se avisa). Para compararlos, la base debe grabarse en el
+entorno donde corre la comprobación: el informe de `--gate --output` (el artefacto
+perf-report del workflow) sirve tal cual como `benchmarks/baseline.json`.
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+LISTING_FIXTURE = os.path.join(FIXTURES_DIR, "wired_listing.html")
+ARTICLE_FIXTURE = os.path.join(FIXTURES_DIR, "wired_article.html")
+SOURCE_NAME = "Wired (fixtures)"
+PARAGRAPHS_PER_ARTICLE = 6
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+# Empeoramiento relativo tolerado frente a la base. Se pueden fijar en la clave
+# "tolerances" de la base o con las opciones --max-*.
+TOLERANCES = {
+    "seconds": 0.5, # Tiempo total de la ejecución
+    "requests": 0.1, # Peticiones al sitio y a la base de datos
+    "stage_p50": 0.5, # Latencia p50 de cada etapa
+    "peak_rss": 0.25, # Memoria pico del proceso y de sus hijos
+}
+STAGE_FLOOR_MS = 2.0 # Las etapas pueden subir esto además de la tolerancia (ruido en las de menos de 1 ms)
+STAGES = ("listing_fetch", "listing_parse", "dedup_check", "article_download", "article_parse", "summarize", "insert", "extract_article_data")
+
+sys.path.insert(0, ROOT_DIR)
+
+class FixtureSite:
+    """Sitio de noticias simulado a partir del listado y el artículo grabados.
+
+    El listado conserva la cabecera y el pie grabados y repite el bloque `<article>` con
+    `n` enlaces distintos. Cada artículo toma un subconjunto fijo de párrafos del
+    artículo grabado, de modo que los textos no son casi duplicados entre sí.
+    """
+
+    def __init__(self, listing_path=LISTING_FIXTURE, article_path=ARTICLE_FIXTURE):
+        with open(listing_path, encoding="utf-8") as f:
+            listing = f.read()
+        with open(article_path, encoding="utf-8") as f:
+            article = f.read()
+        main_start, main_end = listing.index("<main>") + len("<main>"), listing.index("</main>")
+        self.listing_head, self.listing_tail = listing[:main_start], listing[main_end:]
+        self.listing_item = re.search(r"<article.*?</article>", listing[main_start:main_end], re.S).group(0)
+        body_start = article.index('<div class="body__inner-container">')
+        body_end = article.index("</div>", body_start) + len("</div>")
+        self.paragraphs = re.findall(r"<p>.*?</p>", article[body_start:body_end], re.S)
+        self.article_head, self.article_tail = article[:body_start], article[body_end:]
+        self.article_title = re.search(r"<h1[^>]*>(.*?)</h1>", article, re.S).group(1)
+
+    def title(self, index):
+        return f"{self.article_title} ({index})"
+
+    def listing(self, count):
+        items = []
+        for index in range(count):
+            item = re.sub(r'href="/articulo/[^"]*"', f'href="/articulo/{index}"', self.listing_item)
+            item = re.sub(r"(<h3[^>]*>).*?(</h3>)", lambda m: m.group(1) + self.title(index) + m.group(2), item, flags=re.S)
+            items.append(item)
+        return self.listing_head + "\n" + "\n".join(items) + "\n" + self.listing_tail
+
+    def article(self, index):
+        paragraphs = random.Random(index).sample(self.paragraphs, PARAGRAPHS_PER_ARTICLE)
+        head = self.article_head.replace(self.article_title, self.title(index))
+        return head + '<div class="body__inner-container">\n' + "\n".join(paragraphs) + "\n</div>" + self.article_tail
+
+class RequestCounter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {}
+
+    def incr(self, key):
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            counts, self.counts = self.counts, {}
+        return counts
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b"", content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def make_site_handler(site, counter):
+    class SiteHandler(_QuietHandler):
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            counter.incr("site")
+            if parts.path == "/tag/ciberseguridad":
+                count = int(parse_qs(parts.query).get("n", ["10"])[0])
+                self._send(200, site.listing(count).encode("utf-8"), "text/html; charset=utf-8")
+            elif parts.path.startswith("/articulo/"):
+                self._send(200, site.article(int(parts.path.rsplit("/", 1)[1])).encode("utf-8"), "text/html; charset=utf-8")
+            else:
+                self._send(404, b"not found", "text/plain")
+    return SiteHandler
+
+def _split_terms(text):
+    """Separa por comas de primer nivel, respetando paréntesis y comillas."""
+    terms, depth, quoted, current = [], 0, False, ""
+    for index, char in enumerate(text):
+        if char == '"' and (index == 0 or text[index - 1] != "\\"):
+            quoted = not quoted
+        elif not quoted and char in "()":
+            depth += 1 if char == "(" else -1
+        elif not quoted and depth == 0 and char == ",":
+            terms.append(current)
+            current = ""
+            continue
+        current += char
+    return terms + [current]
+
+def _compare(value, op, operand):
+    if op == "is":
+        return value is None if operand == "null" else value is (operand == "true")
+    if value is None:
+        return False
+    if operand.startswith('"'):
+        operand = operand[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+    if isinstance(value, int):
+        operand = int(operand)
+    return {"eq": value == operand, "neq": value != operand, "lt": value < operand,
+            "lte": value <= operand, "gt": value > operand, "gte": value >= operand}[op]
+
+def _row_matches(row, key, value):
+    """Evalúa un filtro de PostgREST (`key=value` de la URL) sobre una fila."""
+    if key in ("or", "and"):
+        results = (_row_matches(row, *_split_filter(term)) for term in _split_terms(value[1:-1]))
+        return any(results) if key == "or" else all(results)
+    op, _, operand = value.partition(".")
+    return _compare(row.get(key), op, operand)
+
+def _split_filter(term):
+    """`columna.op.valor` o `and(...)`/`or(...)` dentro de un `or=(...)`."""
+    if term.startswith(("and(", "or(")):
+        key, _, rest = term.partition("(")
+        return key, "(" + rest
+    column, _, condition = term.partition(".")
+    return column, condition
+
+def _order_rows(rows, order):
+    # Ordenación estable, de la última clave a la primera; nulos al final en asc y al principio en desc
+    for spec in reversed(order.split(",")):
+        column, direction, *nulls = spec.split(".")
+        desc = direction == "desc"
+        nulls_first = nulls[0] == "nullsfirst" if nulls else desc
+        present = sorted((row for row in rows if row.get(column) is not None), key=lambda row: row[column], reverse=desc)
+        missing = [row for row in rows if row.get(column) is None]
+        rows = missing + present if nulls_first else present + missing
+    return rows
+
+class FakePostgrest:
+    """Tabla `amenazas` en memoria que responde como PostgREST a select y upsert.
+
+    Entiende los filtros, `or=(...)` y `order` que usan el pipeline y `read_api`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rows = {}
+
+    def seed(self, count, fuente=SOURCE_NAME):
+        with self._lock:
+            self.rows = {
+                f"http://existente/{index}": {"fuente": fuente, "titulo": f"Artículo existente {index}", "enlace": f"http://existente/{index}"}
+                for index in range(count)
+            }
+
+    def select(self, query, headers):
+        # Filtros `columna=op.valor` (eq, lt, gte... e is.null), `or=(...)` y `order=...`
+        filters = [(key, value) for key, values in query.items() if key not in ("select", "offset", "limit", "order") for value in values]
+        offset, limit = int(query.get("offset", ["0"])[0]), query.get("limit", [None])[0]
+        if headers.get("Range"):
+            start, _, end = headers["Range"].partition("-")
+            offset, limit = int(start), int(end) - int(start) + 1
+        columns = query.get("select", ["*"])[0]
+        with self._lock:
+            rows = [row for row in self.rows.values() if all(_row_matches(row, key, value) for key, value in filters)]
+        if query.get("order"):
+            rows = _order_rows(rows, query["order"][0])
+        rows = rows[offset:offset + int(limit)] if limit is not None else rows[offset:]
+        if columns != "*":
+            rows = [{column: row.get(column) for column in columns.split(",")} for row in rows]
+        return rows
+
+    def upsert(self, rows):
+        with self._lock:
+            for row in rows if isinstance(rows, list) else [rows]:
+                self.rows.setdefault(row["enlace"], row) # ignore-duplicates
+
+def make_postgrest_handler(table, counter):
+    class PostgrestHandler(_QuietHandler):
+        def do_GET(self):
+            counter.incr("postgrest")
+            parts = urlsplit(self.path)
+            self._send(200, json.dumps(table.select(parse_qs(parts.query), self.headers)).encode("utf-8"))
+
+        def do_POST(self):
+            counter.incr("postgrest")
+            table.upsert(json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0)))))
+            self._send(201)
+
+        def do_HEAD(self):
+            counter.incr("postgrest")
+            self._send(200)
+    return PostgrestHandler
+
+def start_server(handler):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def fixtures_digest():
+    digest = hashlib.sha256()
+    for path in (LISTING_FIXTURE, ARTICLE_FIXTURE):
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _stage_summary(report):
+    stages = {}
+    for stage, sources in report["stages"].items():
+        summary = sources.get(SOURCE_NAME) or next(iter(sources.values()))
+        stages[stage] = {"count": summary["count"], "p50_ms": summary["p50"] * 1000, "p95_ms": summary["p95"] * 1000}
+    return stages
+
+def run_child(args):
+    """Ejecuta una escala dentro de este proceso y escribe el resultado en JSON por stdout."""
+    import scraper
+    from metrics import metrics
+    from sources import load_sources
+
+    website = dict(load_sources()[0])
+    website.pop("feed", None)
+    website.pop("sitemap", None)
+    website.update({
+        "name": SOURCE_NAME,
+        "url": f"{args.site}/tag/ciberseguridad?n={args.scale}",
+        "base_url": args.site,
+        "num_articles": args.scale,
+        "max_listing_items": args.scale,
+        "max_concurrent": args.max_in_flight,
+        "rate_limit": None,
+    })
+    supabase = scraper.create_supabase_client({"supabase_url": args.postgrest, "supabase_key": "bench.bench.bench"})
+    metrics.reset()
+
+    start = time.perf_counter()
+    if args.mode == "extract":
+        processed = 0
+        for index in range(args.scale):
+            with metrics.time("extract_article_data", SOURCE_NAME):
+                title, summary, _ = scraper.extract_article_data(f"{args.site}/articulo/{index}")
+            processed += bool(title and summary)
+    else:
+        processed = len(scraper.scrape_website(website, max_in_flight=args.max_in_flight, deadline=time.monotonic() + args.timeout, supabase=supabase))
+    elapsed = time.perf_counter() - start
+
+    # ru_maxrss está en KiB en Linux y en bytes en macOS
+    unit = 1 if sys.platform == "darwin" else 1024
+    result = {
+        "articles": processed,
+        "seconds": elapsed,
+        "articles_per_second": processed / elapsed if elapsed else None,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit / 2 ** 20,
+        "peak_rss_children_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit / 2 ** 20,
+        "stages": _stage_summary(metrics.report()),
+        "counters": {name: sum(values.values()) for name, values in metrics.report()["counters"].items()},
+    }
+    json.dump(result, sys.stdout)
+
+def run_scale(args, scale, site_url, postgrest_url, table, counter, verbose=False):
+    table.seed(args.existing)
+    counter.reset()
+    with tempfile.TemporaryDirectory(prefix="bench-scraper-") as tmp:
+        env = dict(
+            os.environ,
+            HTTP_CACHE_DIR=os.path.join(tmp, "http"),
+            SUMMARY_CACHE_PATH=os.path.join(tmp, "summaries.sqlite"),
+            CRAWL_STATE_PATH=os.path.join(tmp, "crawl_state.sqlite"),
+            NEAR_DUP_PATH=os.path.join(tmp, "near_dup.sqlite"),
+            HTML_ARCHIVE_DIR=os.path.join(tmp, "archive"),
+            NO_PROXY="127.0.0.1,localhost",
+        )
+        command = [
+            sys.executable, os.path.abspath(__file__), "--child", "--mode", args.mode, "--scale", str(scale),
+            "--site", site_url, "--postgrest", postgrest_url, "--max-in-flight", str(args.max_in_flight), "--timeout", str(args.timeout),
+        ]
+        completed = subprocess.run(command, cwd=ROOT_DIR, env=env, stdout=subprocess.PIPE, stderr=None if verbose else subprocess.DEVNULL, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"La ejecución con {scale} artículos terminó con código {completed.returncode}")
+    result = json.loads(completed.stdout)
+    result["scale"] = scale
+    result["round_trips"] = counter.reset()
+    result["rows_in_table"] = len(table.rows) - args.existing
+    return result
+
+def print_results(results, baseline=None):
+    previous = {result["scale"]: result for result in (baseline or {}).get("results", [])}
+    print(f"{'escala':>7}{'art/s':>10}{'s':>9}{'RSS MB':>9}{'hijos MB':>10}{'sitio':>7}{'BD':>5}")
+    for result in results:
+        trips = result["round_trips"]
+        line = f"{result['scale']:>7}{result['articles_per_second'] or 0:>10.1f}{result['seconds']:>9.2f}{result['peak_rss_mb']:>9.1f}{result['peak_rss_children_mb']:>10.1f}{trips.get('site', 0):>7}{trips.get('postgrest', 0):>5}"
+        before = previous.get(result["scale"])
+        if before and before.get("articles_per_second") and result["articles_per_second"]:
+            line += f"   {result['articles_per_second'] / before['articles_per_second'] - 1:+.1%} art/s frente a la base"
+        print(line)
+        for stage in STAGES:
+            summary = result["stages"].get(stage)
+            if summary:
+                print(f"{'':>9}{stage:<22}n={summary['count']:<6}p50={summary['p50_ms']:>8.2f} ms  p95={summary['p95_ms']:>8.2f} ms")
+
+def find_regressions(report, baseline, tolerances=None, stage_floor_ms=STAGE_FLOOR_MS, timings=True):
+    """Compara un informe con la base. Devuelve la lista de regresiones (vacía si no hay).
+
+    Con `timings=False` solo se comparan los artículos y las peticiones, que no dependen
+    del entorno; el tiempo, las latencias y la memoria se omiten.
+    """
+    tolerances = dict(TOLERANCES, **(tolerances or {}))
+    previous = {result["scale"]: result for result in baseline.get("results", [])}
+    regressions = []
+
+    def check(scale, name, value, before, tolerance, floor=0.0):
+        if value is None or before is None:
+            return
+        limit = before * (1 + tolerance) + floor
+        if value > limit:
+            regressions.append(f"escala {scale}: {name} {round(value, 2):g} supera el límite {round(limit, 2):g} (base {round(before, 2):g})")
+
+    for result in report["results"]:
+        scale, before = result["scale"], previous.get(result["scale"])
+        if before is None:
+            continue
+        if result["articles"] < before["articles"]:
+            regressions.append(f"escala {scale}: {result['articles']} artículos procesados frente a {before['articles']} en la base")
+        for kind in sorted(set(result["round_trips"]) | set(before["round_trips"])):
+            check(scale, f"peticiones a {kind}", result["round_trips"].get(kind, 0), before["round_trips"].get(kind, 0), tolerances["requests"])
+        if not timings:
+            continue
+        check(scale, "segundos", result["seconds"], before["seconds"], tolerances["seconds"])
+        check(scale, "RSS MB", result["peak_rss_mb"], before["peak_rss_mb"], tolerances["peak_rss"])
+        check(scale, "RSS hijos MB", result["peak_rss_children_mb"], before["peak_rss_children_mb"], tolerances["peak_rss"])
+        for stage, summary in result["stages"].items():
+            if stage in before["stages"]:
+                check(scale, f"p50 de {stage} (ms)", summary["p50_ms"], before["stages"][stage]["p50_ms"], tolerances["stage_p50"], stage_floor_ms)
+    return regressions
+
+def _python_version(version):
+    """`3.9.18` -> `3.9`: las versiones de corrección no cambian el rendimiento."""
+    return ".".join((version or "").split(".")[:2])
+
+def run_gate(args):
+    """Mide con las opciones de la base y la compara. Devuelve el código de salida."""
+    try:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"No se pudo leer la base {args.baseline}: {e}", file=sys.stderr)
+        return 2
+    if baseline.get("fixtures") != fixtures_digest():
+        print(f"La base {args.baseline} se generó con otros fixtures; hay que regenerarla con --output.", file=sys.stderr)
+        return 2
+    args.scales = [result["scale"] for result in baseline["results"]]
+    args.mode, args.existing, args.max_in_flight = baseline["mode"], baseline["existing"], baseline["max_in_flight"]
+    tolerances = dict(baseline.get("tolerances") or {})
+    for name in TOLERANCES:
+        override = getattr(args, f"max_{name}")
+        if override is not None:
+            tolerances[name] = override
+
+    report = run_benchmark(args)
+    print(f"commit {report['commit']} · base {baseline.get('commit')} ({baseline.get('cpus')} CPU) · {report['cpus']} CPU")
+    print_results(report["results"], baseline)
+    if args.output:
+        # Con las tolerancias incluidas, el informe sirve tal cual como base nueva
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(dict(report, tolerances=tolerances, baseline=baseline.get("commit")), f, indent=4, ensure_ascii=False)
+    # Artículos y peticiones se comparan siempre; tiempos, latencias y memoria solo en el mismo entorno
+    differences = []
+    if _python_version(baseline.get("python")) != _python_version(report["python"]):
+        differences.append(f"Python {baseline.get('python')} en la base y {report['python']} aquí")
+    if baseline.get("cpus") != report["cpus"]:
+        differences.append(f"{baseline.get('cpus')} CPU en la base y {report['cpus']} aquí")
+    if differences:
+        print(f"AVISO: la base se midió en otro entorno ({'; '.join(differences)}). Solo se comparan artículos y peticiones.")
+        print(f"Para comparar también tiempos y memoria, guarda el informe de este entorno como {args.baseline}.")
+    regressions = find_regressions(report, baseline, tolerances, timings=not differences)
+    for regression in regressions:
+        print(f"REGRESIÓN {regression}")
+    if not regressions:
+        print("Sin regresiones frente a la base.")
+    return 1 if regressions else 0
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[10, 100, 1000], help="artículos por ejecución")
+    parser.add_argument("--mode", choices=("pipeline", "extract"), default="pipeline", help="scrape_website completo o extract_article_data en serie")
+    parser.add_argument("--existing", type=int, default=0, help="filas previas en la tabla falsa (coste de cargar el índice de duplicados)")
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    parser.add_argument("--timeout", type=int, default=600)
+    parser.add_argument("--output", help="guarda los resultados en JSON para compararlos entre commits")
+    parser.add_argument("--compare", help="resultados JSON de otra ejecución con los que comparar")
+    parser.add_argument("--verbose", action="store_true", help="muestra el log del scraper")
+    parser.add_argument("--gate", action="store_true", help="compara con --baseline y termina con código 1 si hay regresiones")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="base guardada para --gate")
+    parser.add_argument("--max-seconds", type=float, help=f"con --gate, aumento relativo tolerado del tiempo (por defecto {TOLERANCES['seconds']})")
+    parser.add_argument("--max-requests", type=float, help=f"con --gate, aumento relativo tolerado de las peticiones (por defecto {TOLERANCES['requests']})")
+    parser.add_argument("--max-stage-p50", dest="max_stage_p50", type=float, help=f"con --gate, aumento relativo tolerado del p50 de cada etapa (por defecto {TOLERANCES['stage_p50']})")
+    parser.add_argument("--max-peak-rss", dest="max_peak_rss", type=float, help=f"con --gate, aumento relativo tolerado de la memoria pico (por defecto {TOLERANCES['peak_rss']})")
+    # Uso interno: una escala en un proceso aislado
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--scale", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--site", help=argparse.SUPPRESS)
+    parser.add_argument("--postgrest", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+def run_benchmark(args):
+    """Arranca los servidores locales y mide cada escala. Devuelve el informe completo."""
+    counter, table = RequestCounter(), FakePostgrest()
+    site_server = start_server(make_site_handler(FixtureSite(), counter))
+    postgrest_server = start_server(make_postgrest_handler(table, counter))
+    site_url = f"http://127.0.0.1:{site_server.server_address[1]}"
+    postgrest_url = f"http://127.0.0.1:{postgrest_server.server_address[1]}"
+    try:
+        results = [run_scale(args, scale, site_url, postgrest_url, table, counter, args.verbose) for scale in args.scales]
+    finally:
+        site_server.shutdown()
+        postgrest_server.shutdown()
+    return {
+        "commit": git_commit(),
+        "mode": args.mode,
+        "existing": args.existing,
+        "max_in_flight": args.max_in_flight,
+        "fixtures": fixtures_digest(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "results": results,
+    }
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.child:
+        run_child(args)
+        return 0
+    if args.gate:
+        return run_gate(args)
+
+    report = run_benchmark(args)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print(f"commit {report['commit']} · modo {report['mode']} · fixtures {report['fixtures']} · {report['cpus']} CPU")
+    print_results(report["results"], baseline)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
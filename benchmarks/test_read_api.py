@@ -0,0 +1,74 @@
+"""Comprueba `read_api.ArticleReader` contra el PostgREST falso de bench_pipeline.
+
+Uso: python -m unittest discover benchmarks
+"""
+
+import base64
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_pipeline import FakePostgrest, RequestCounter, make_postgrest_handler, start_server
+from read_api import ArticleReader, TTLCache, decode_cursor
+
+# Varias filas por fecha para que el desempate por id cruce límites de página
+DATES = ["2024-05-02", "2024-05-02", "2024-05-02", "2024-05-01", "2024-05-01", None, None]
+
+def _cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii").rstrip("=")
+
+class ArticleReaderTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        from supabase import create_client
+
+        os.environ.setdefault("NO_PROXY", "127.0.0.1")
+        cls.counter, cls.table = RequestCounter(), FakePostgrest()
+        cls.table.rows = {
+            f"http://a/{row_id}": {"id": row_id, "fuente": "a", "titulo": f"Artículo {row_id}", "enlace": f"http://a/{row_id}",
+                                   "resumen": "", "fecha_publicacion": published}
+            for row_id, published in enumerate(DATES, start=1)
+        }
+        cls.server = start_server(make_postgrest_handler(cls.table, cls.counter))
+        cls.client = create_client(f"http://127.0.0.1:{cls.server.server_address[1]}", "test.test.test")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def setUp(self):
+        self.reader = ArticleReader(self.client, cache=TTLCache())
+        self.counter.reset()
+
+    def test_pages_cross_equal_dates_without_gaps(self):
+        ids, cursor = [], None
+        while True:
+            page = self.reader.list_articles(cursor=cursor, limit=2)
+            ids.extend(item["id"] for item in page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(ids, [3, 2, 1, 5, 4, 7, 6])
+
+    def test_since_skips_undated(self):
+        page = self.reader.list_articles(since="2024-05-02", limit=10)
+        self.assertEqual([item["id"] for item in page["items"]], [3, 2, 1])
+        self.assertIsNone(page["next_cursor"])
+
+    def test_tampered_cursor_is_rejected(self):
+        for cursor in ("no es base64!", _cursor(["2024-05-02"]), _cursor(["2024-05-02", "3"]), _cursor({"id": 3})):
+            with self.assertRaises(ValueError):
+                self.reader.list_articles(cursor=cursor)
+        self.assertEqual(decode_cursor(_cursor(["2024-05-02", 3])), ("2024-05-02", 3))
+        self.assertEqual(self.counter.reset(), {})
+
+    def test_missing_article_is_cached(self):
+        self.assertIsNone(self.reader.get_article("http://a/no-existe"))
+        self.assertIsNone(self.reader.get_article("http://a/no-existe"))
+        self.assertEqual(self.counter.reset().get("postgrest"), 1)
+
+if __name__ == "__main__":
+    unittest.main()
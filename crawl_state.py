@@ -0,0 +1,135 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    name TEXT PRIMARY KEY,
+    listing_fingerprint TEXT,
+    watermark_url TEXT,
+    watermark_date TEXT,
+    relevance_config TEXT,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS seen (
+    source TEXT NOT NULL,
+    url TEXT NOT NULL,
+    published TEXT,
+    seen_at TEXT NOT NULL,
+    PRIMARY KEY (source, url)
+);
+CREATE TABLE IF NOT EXISTS relevance (
+    source TEXT NOT NULL,
+    url TEXT NOT NULL,
+    title TEXT,
+    score REAL NOT NULL,
+    passed INTEGER NOT NULL,
+    scored_at TEXT NOT NULL,
+    PRIMARY KEY (source, url)
+);
+"""
+
+def listing_fingerprint(candidates):
+    """Huella del listado: depende solo de los enlaces y títulos, no del HTML alrededor."""
+    digest = hashlib.sha256()
+    for candidate in candidates:
+        digest.update(candidate["url"].encode("utf-8") + b"\0" + candidate["title"].encode("utf-8") + b"\n")
+    return digest.hexdigest()
+
+class CrawlState:
+    """Estado incremental del rastreo por fuente, guardado en SQLite.
+
+    Por fuente recuerda los enlaces ya tratados, la huella del último listado completo y
+    una marca de agua: el candidato más reciente de la última ejecución que trató todo el
+    listado. Todo lo que queda por debajo de la marca ya se procesó en ejecuciones
+    anteriores, así que el recorrido del listado puede detenerse al alcanzarla.
+
+    También guarda la configuración del filtro de relevancia con la que se fijó la marca:
+    los candidatos filtrados quedan por debajo de ella, así que si la configuración
+    cambia hay que volver a recorrer el listado para puntuarlos de nuevo.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get("CRAWL_STATE_PATH", ".cache/crawl_state.sqlite")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+        columns = {row[1] for row in self._connection.execute("PRAGMA table_info(sources)")}
+        if "relevance_config" not in columns: # Estado creado antes del filtro de relevancia
+            self._connection.execute("ALTER TABLE sources ADD COLUMN relevance_config TEXT")
+
+    def _source_row(self, source):
+        return self._connection.execute(
+            "SELECT listing_fingerprint, watermark_url, watermark_date, relevance_config FROM sources WHERE name = ?", (source,)
+        ).fetchone()
+
+    def listing_unchanged(self, source, fingerprint):
+        """True si el listado es idéntico al de la última ejecución completa."""
+        with self._lock:
+            row = self._source_row(source)
+        return row is not None and row[0] == fingerprint
+
+    def reached_watermark(self, source, url, published=None):
+        """True si el candidato es la marca de agua o es más antiguo que ella."""
+        with self._lock:
+            row = self._source_row(source)
+        if row is None:
+            return False
+        _, watermark_url, watermark_date, _ = row
+        if url == watermark_url:
+            return True
+        if published is not None and watermark_date:
+            watermark = datetime.fromisoformat(watermark_date)
+            if (published.tzinfo is None) == (watermark.tzinfo is None):
+                return published < watermark
+        return False
+
+    def relevance_changed(self, source, config):
+        """True si el filtro de relevancia de la fuente no es el de la última ejecución completa."""
+        with self._lock:
+            row = self._source_row(source)
+        return row is not None and row[3] != config
+
+    def is_seen(self, source, url):
+        with self._lock:
+            return self._connection.execute("SELECT 1 FROM seen WHERE source = ? AND url = ?", (source, url)).fetchone() is not None
+
+    def mark_seen(self, source, urls_with_dates):
+        """Registra enlaces tratados: iterable de `(url, fecha_publicacion o None)`."""
+        now = datetime.utcnow().isoformat()
+        rows = [(source, url, published.isoformat() if published else None, now) for url, published in urls_with_dates]
+        with self._lock, self._connection:
+            self._connection.executemany("INSERT OR REPLACE INTO seen (source, url, published, seen_at) VALUES (?, ?, ?, ?)", rows)
+
+    def record_relevance(self, source, scores):
+        """Guarda la puntuación del filtro de relevancia: iterable de `(url, titulo, puntuacion, aceptado)`."""
+        now = datetime.utcnow().isoformat()
+        rows = [(source, url, title, score, int(passed), now) for url, title, score, passed in scores]
+        with self._lock, self._connection:
+            self._connection.executemany("INSERT OR REPLACE INTO relevance (source, url, title, score, passed, scored_at) VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def complete_run(self, source, fingerprint, top_candidate, relevance_config=None):
+        """Guarda la huella del listado y avanza la marca de agua tras tratar todo el listado.
+
+        `relevance_config` es la de `relevance.relevance_config` con la que se recorrió.
+        """
+        published = top_candidate["published"] if top_candidate else None
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO sources (name, listing_fingerprint, watermark_url, watermark_date, relevance_config, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (source, fingerprint, top_candidate["url"] if top_candidate else None, published.isoformat() if published else None, relevance_config, datetime.utcnow().isoformat()),
+            )
+
+_default_state = None
+_default_state_lock = threading.Lock()
+
+def get_crawl_state():
+    """Devuelve el estado de rastreo compartido del proceso, creándolo la primera vez."""
+    global _default_state
+    with _default_state_lock:
+        if _default_state is None:
+            _default_state = CrawlState()
+        return _default_state
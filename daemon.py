@@ -0,0 +1,145 @@
+import asyncio
+import json
+import logging
+import random
+import signal
+import time
+
+from metrics import metrics as stage_metrics
+
+DEFAULT_INTERVAL = 24 * 60 * 60
+DEFAULT_JITTER = 5 * 60
+
+class SourceScheduler:
+    """Planificador asyncio que duerme hasta la siguiente fuente pendiente.
+
+    Cada fuente se ejecuta cada `interval` segundos (clave de `sources.json`, por
+    defecto un día) más un retraso aleatorio de hasta `jitter` segundos. Una fuente
+    nunca se solapa consigo misma: si su ejecución anterior sigue en marcha, se aplaza.
+    `run_source` es una función bloqueante que recibe la fuente; se ejecuta en un hilo.
+    """
+
+    def __init__(self, websites, run_source, max_concurrent_jobs=4):
+        self.websites = {website["name"]: website for website in websites}
+        self.run_source = run_source
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.next_run = {}
+        self.running = set()
+        self.stats = {name: {"runs": 0, "failures": 0, "articles": 0, "last_run": None, "last_duration": None} for name in self.websites}
+        self.started_at = time.time()
+        self._stop = None
+        self._tasks = set()
+
+    def _schedule(self, name, base_delay):
+        website = self.websites[name]
+        delay = base_delay + random.uniform(0, website.get("jitter", DEFAULT_JITTER))
+        self.next_run[name] = time.monotonic() + delay
+        logging.info(f"Próxima ejecución de {name} en {delay:.0f} s.")
+
+    async def _run(self, name):
+        self.running.add(name)
+        started = time.monotonic()
+        stats = self.stats[name]
+        try:
+            articles = await asyncio.get_running_loop().run_in_executor(None, self.run_source, self.websites[name])
+            stats["articles"] += len(articles or [])
+        except Exception as e:
+            stats["failures"] += 1
+            logging.exception(f"Error en la ejecución programada de {name}: {e}")
+        finally:
+            stats["runs"] += 1
+            stats["last_run"] = time.time()
+            stats["last_duration"] = time.monotonic() - started
+            self.running.discard(name)
+            self._schedule(name, self.websites[name].get("interval", DEFAULT_INTERVAL))
+
+    def stop(self):
+        logging.info("Parada solicitada: se esperan las ejecuciones en curso.")
+        self._stop.set()
+
+    async def run(self):
+        self._stop = asyncio.Event()
+        for name in self.websites:
+            self._schedule(name, 0)
+
+        while not self._stop.is_set():
+            now = time.monotonic()
+            for name in sorted(self.next_run, key=self.next_run.get):
+                if self.next_run[name] > now or len(self.running) >= self.max_concurrent_jobs:
+                    break
+                if name in self.running:
+                    continue
+                del self.next_run[name]
+                task = asyncio.ensure_future(self._run(name))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+            # Duerme hasta la siguiente fuente pendiente, o hasta que acabe una ejecución
+            timeout = max(0.0, min(self.next_run.values()) - time.monotonic()) if self.next_run else None
+            waiters = [asyncio.ensure_future(self._stop.wait())] + list(self._tasks)
+            done, _ = await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            waiters[0].cancel()
+
+        if self._tasks:
+            await asyncio.wait(list(self._tasks))
+        logging.info("Planificador detenido.")
+
+    def health(self):
+        return {
+            "status": "stopping" if self._stop is not None and self._stop.is_set() else "ok",
+            "uptime": time.time() - self.started_at,
+            "running": sorted(self.running),
+            "sources": self.stats,
+        }
+
+    def metrics(self):
+        lines = []
+        for metric, key, kind in (("scraper_runs_total", "runs", "counter"), ("scraper_failures_total", "failures", "counter"), ("scraper_articles_total", "articles", "counter"), ("scraper_last_run_timestamp", "last_run", "gauge"), ("scraper_last_run_duration_seconds", "last_duration", "gauge")):
+            lines.append(f"# TYPE {metric} {kind}")
+            for name, stats in self.stats.items():
+                if stats[key] is not None:
+                    lines.append(f'{metric}{{source={json.dumps(name, ensure_ascii=False)}}} {stats[key]}')
+        lines.append("# TYPE scraper_running_jobs gauge")
+        lines.append(f"scraper_running_jobs {len(self.running)}")
+        # Tiempos por etapa y contadores acumulados desde el arranque
+        return "\n".join(lines) + "\n" + stage_metrics.prometheus()
+
+async def _serve_health(scheduler, reader, writer):
+    try:
+        request_line = (await reader.readline()).decode("latin-1").split()
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+        path = request_line[1] if len(request_line) > 1 else "/"
+        if path == "/health":
+            status, content_type, body = "200 OK", "application/json", json.dumps(scheduler.health(), ensure_ascii=False)
+        elif path == "/metrics":
+            status, content_type, body = "200 OK", "text/plain; version=0.0.4", scheduler.metrics()
+        else:
+            status, content_type, body = "404 Not Found", "text/plain", "not found\n"
+        payload = body.encode("utf-8")
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {content_type}; charset=utf-8\r\nContent-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode("latin-1") + payload)
+        await writer.drain()
+    finally:
+        writer.close()
+
+async def run_daemon(websites, run_source, health_host="127.0.0.1", health_port=None, max_concurrent_jobs=4):
+    """Ejecuta el planificador hasta recibir SIGTERM/SIGINT.
+
+    Con `health_port` expone `/health` (JSON) y `/metrics` (formato Prometheus).
+    """
+    scheduler = SourceScheduler(websites, run_source, max_concurrent_jobs=max_concurrent_jobs)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, scheduler.stop)
+
+    server = None
+    if health_port:
+        server = await asyncio.start_server(lambda r, w: _serve_health(scheduler, r, w), health_host, health_port)
+        logging.info(f"Salud y métricas en http://{health_host}:{health_port}/health y /metrics")
+    try:
+        await scheduler.run()
+    finally:
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+    return scheduler
@@ -0,0 +1,54 @@
+import logging
+from urllib.parse import urlsplit, urlunsplit
+
+def normalize_title(title):
+    """Normaliza un título para compararlo: minúsculas y espacios colapsados."""
+    return " ".join(title.lower().split())
+
+def normalize_url(url):
+    """Normaliza un enlace para compararlo: sin fragmento ni barra final."""
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), parts.query, ""))
+
+class DedupIndex:
+    """Índice en memoria de los títulos y enlaces ya guardados en `amenazas`.
+
+    Se carga con una sola consulta paginada al inicio de la ejecución; después cada
+    comprobación es una búsqueda local y las nuevas inserciones actualizan el índice.
+    """
+
+    def __init__(self):
+        self.titles = set()
+        self.urls = set()
+
+    @classmethod
+    def load(cls, supabase, fuente=None, page_size=1000):
+        """Carga títulos y enlaces existentes (solo esas columnas) de una fuente."""
+        index = cls()
+        start = 0
+        while True:
+            query = supabase.table("amenazas").select("titulo,enlace")
+            if fuente is not None:
+                query = query.eq("fuente", fuente)
+            # Sin orden estable, Postgres puede repetir u omitir filas entre páginas
+            rows = query.order("id").range(start, start + page_size - 1).execute().data
+            for row in rows:
+                index.add(row.get("titulo"), row.get("enlace"))
+            if len(rows) < page_size:
+                break
+            start += page_size
+        logging.info(f"Índice de duplicados cargado: {len(index.titles)} títulos, {len(index.urls)} enlaces.")
+        return index
+
+    def contains(self, title=None, url=None):
+        """Indica si el título o el enlace ya están en el índice."""
+        if title and normalize_title(title) in self.titles:
+            return True
+        return bool(url) and normalize_url(url) in self.urls
+
+    def add(self, title=None, url=None):
+        """Registra un artículo recién insertado."""
+        if title:
+            self.titles.add(normalize_title(title))
+        if url:
+            self.urls.add(normalize_url(url))
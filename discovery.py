@@ -0,0 +1,122 @@
+import logging
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+
+import requests
+from lxml import etree
+
+from http_cache import get_cache, sniff_encoding
+from listing_parser import CHUNK_SIZE, iter_listing_items
+from metrics import metrics
+from sources import resolve_link
+
+ITEM_TAGS = frozenset(("item", "entry", "url")) # RSS, Atom y sitemap de noticias
+
+def _parse_date(value):
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return parsedate_to_datetime(value) # RSS (RFC 822)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")) # Atom y sitemap (ISO 8601)
+    except ValueError:
+        return None
+
+def _item_fields(item):
+    fields = {}
+    for child in item.iter():
+        if not isinstance(child.tag, str) or child is item:
+            continue
+        name = etree.QName(child).localname
+        text = (child.text or "").strip()
+        if name == "link":
+            # Atom guarda el enlace en href; solo interesa el alternativo
+            if child.get("href") and child.get("rel", "alternate") == "alternate":
+                fields.setdefault("link", child.get("href"))
+            elif text:
+                fields.setdefault("link", text)
+        elif name == "loc" and text:
+            fields.setdefault("link", text)
+        elif name == "title" and text:
+            fields.setdefault("title", text)
+        elif name in ("pubDate", "published", "publication_date", "updated", "lastmod") and text:
+            fields.setdefault("published", text)
+        elif name in ("description", "summary") and text:
+            fields.setdefault("teaser", text)
+    return fields
+
+def iter_feed_items(content, max_items=10):
+    """Recorre los elementos de un RSS, Atom o sitemap de noticias analizándolo por trozos.
+
+    Genera dicts con `title`, `link`, `published` (datetime o None) y `teaser`.
+    Se detiene tras `max_items` elementos.
+    """
+    parser = etree.XMLPullParser(events=("end",), recover=True, resolve_entities=False)
+    seen = 0
+    for offset in range(0, len(content), CHUNK_SIZE):
+        parser.feed(content[offset:offset + CHUNK_SIZE])
+        for _, element in parser.read_events():
+            if not isinstance(element.tag, str) or etree.QName(element).localname not in ITEM_TAGS:
+                continue
+            fields = _item_fields(element)
+            element.clear()
+            if not fields.get("link"):
+                continue
+            yield {
+                "title": fields.get("title", ""),
+                "link": fields["link"],
+                "published": _parse_date(fields.get("published")),
+                "teaser": fields.get("teaser", ""),
+            }
+            seen += 1
+            if seen >= max_items:
+                return
+    parser.close()
+
+def _discover_from_feed(source, feed_url, max_items):
+    with metrics.time("listing_fetch", source["name"]):
+        response = get_cache().get(feed_url, timeout=15)
+    candidates = []
+    with metrics.time("listing_parse", source["name"]):
+        for item in iter_feed_items(response.content, max_items):
+            candidates.append({
+                "title": item["title"],
+                "url": resolve_link(source, item["link"]),
+                "published": item["published"],
+                "teaser": item["teaser"],
+            })
+    return candidates
+
+def _discover_from_listing(source, max_items):
+    with metrics.time("listing_fetch", source["name"]):
+        response = get_cache().get(source["url"], timeout=15)
+    with metrics.time("listing_parse", source["name"]):
+        return [
+            {"title": title, "url": resolve_link(source, href), "published": None, "teaser": ""}
+            for title, href in iter_listing_items(response.content, max_items, selectors=source.get("selectors"), encoding=response.encoding or sniff_encoding(response.content))
+        ]
+
+def discover_candidates(source, max_items=10):
+    """Devuelve los artículos candidatos de una fuente.
+
+    Prueba primero el feed RSS/Atom (`feed`) y el sitemap de noticias (`sitemap`) de la
+    fuente, con GET condicional; si no hay ninguno o fallan, analiza la página de
+    listado HTML. Cada candidato es un dict con `title`, `url`, `published` y `teaser`.
+    """
+    for key in ("feed", "sitemap"):
+        feed_url = source.get(key)
+        if not feed_url:
+            continue
+        try:
+            candidates = _discover_from_feed(source, feed_url, max_items)
+        except (requests.exceptions.RequestException, etree.LxmlError) as e:
+            logging.warning(f"No se pudo usar el {key} {feed_url} de {source['name']}: {e}")
+            continue
+        if candidates:
+            logging.info(f"{len(candidates)} candidatos obtenidos del {key} de {source['name']}")
+            return candidates
+        logging.warning(f"El {key} {feed_url} de {source['name']} no tiene elementos.")
+    return _discover_from_listing(source, max_items)
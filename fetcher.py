@@ -0,0 +1,254 @@
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime
+from functools import partial
+from urllib.parse import urlparse
+
+import requests
+
+from archive import archive_page, get_archive
+from http_cache import get_cache
+from metrics import metrics
+from near_dup import get_near_dup_index, simhash
+from rate_limiter import HostLimiter, host_limiter # noqa: F401 (se reexportan)
+from summarizer import summarize
+
+# `simhash` es la huella del texto; `duplicate_of`, el enlace de un artículo casi idéntico
+# ya guardado (en ese caso no se calcula el resumen); `timings`, los segundos de cada
+# etapa medidos en el proceso de análisis.
+ParsedArticle = namedtuple("ParsedArticle", ["title", "summary", "publish_date", "simhash", "duplicate_of", "timings"])
+FAILED = ParsedArticle(None, None, None, None, None, {})
+HOST_POLL_INTERVAL = 0.05 # Segundos entre comprobaciones de un host ocupado por otra fuente
+
+def _download(url, source=""):
+    try:
+        with metrics.time("article_download", source):
+            response = get_cache().get(url)
+        metrics.incr("articles_not_modified" if response.not_modified else "articles_downloaded", source)
+        # El HTML queda archivado para poder volver a analizarlo sin descargarlo
+        archive_page(url, response.content, response.encoding, source)
+        return response
+    except requests.exceptions.RequestException as e:
+        logging.warning(f"No se pudo descargar el artículo de {url}: {e}")
+        metrics.incr("download_failures", source)
+        return None
+    except Exception as e:
+        logging.exception(f"Error inesperado al descargar {url}: {e}")
+        return None
+
+def download_article_html(url):
+    """Descarga el HTML de un artículo (con caché condicional). Devuelve None si falla."""
+    response = _download(url)
+    return response.text if response is not None else None
+
+def _load_extracted(url):
+    extracted = get_cache().get_meta(url, "extracted")
+    if extracted is None or len(extracted) != 4:
+        return None
+    title, summary, publish_date, fingerprint = extracted
+    return ParsedArticle(title, summary, datetime.fromisoformat(publish_date) if publish_date else None, fingerprint, None, {})
+
+def _store_extracted(url, result):
+    if result.title and result.summary:
+        publish_date_str = result.publish_date.isoformat() if isinstance(result.publish_date, datetime) else None
+        get_cache().set_meta(url, "extracted", [result.title, result.summary, publish_date_str, result.simhash])
+
+def parse_article_html(url, html, refresh_summary=False):
+    """Analiza el HTML ya descargado y devuelve un `ParsedArticle`.
+
+    Se ejecuta en un proceso aparte y no toca la red. Antes de resumir consulta el índice
+    de casi duplicados: si el texto ya está guardado con otro enlace, no se resume. El
+    resumen sale de `summarizer.summarize` en lugar de `Article.nlp()`; con
+    `refresh_summary` se recalcula aunque esté en la caché de resúmenes.
+    """
+    import newspaper # Solo lo cargan los procesos de análisis
+
+    try:
+        start = time.perf_counter()
+        article = newspaper.Article(url)
+        article.download(input_html=html)
+        article.parse()
+        fingerprint = simhash(article.text)
+        duplicate_of = get_near_dup_index().find(fingerprint, exclude_url=url)
+        timings = {"article_parse": time.perf_counter() - start}
+        if duplicate_of:
+            return ParsedArticle(article.title, None, article.publish_date, fingerprint, duplicate_of, timings)
+        start = time.perf_counter()
+        summary = summarize(article.title, article.text, refresh=refresh_summary)
+        timings["summarize"] = time.perf_counter() - start
+        return ParsedArticle(article.title, summary, article.publish_date, fingerprint, None, timings)
+    except newspaper.article.ArticleException as e:
+        logging.error(f"Error al procesar el artículo {url}: {e}")
+        return FAILED
+    except Exception as e:
+        logging.exception(f"Error inesperado al procesar {url}: {e}")
+        return FAILED
+
+def _init_parse_worker(level):
+    logging.basicConfig(level=level, format='%(asctime)s - %(levelname)s - %(message)s')
+
+def create_parse_pool(max_workers=None):
+    """Crea el pool de procesos de análisis.
+
+    Sus procesos se lanzan bajo demanda, cuando los hilos de descarga ya usan SQLite
+    (archivo HTML, cachés). Con fork, un hijo podía heredar un mutex de SQLite tomado por
+    uno de esos hilos y bloquearse al abrir o cerrar una conexión. Donde existe, los
+    procesos salen de un `forkserver`, que arranca sin hilos y con los módulos de
+    análisis ya cargados.
+    """
+    context = None
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["fetcher", "newspaper"])
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=context, initializer=_init_parse_worker, initargs=(logging.getLogger().level,))
+
+def fetch_articles(urls, max_in_flight=8, parse_workers=None, deadline=None, limiter=None, download_pool=None, parse_pool=None, source="", max_parse_backlog=None, remaining=None):
+    """Descarga y procesa artículos de forma concurrente.
+
+    Mantiene como máximo `max_in_flight` descargas activas en un pool de hilos y envía el
+    análisis a un pool de procesos. Los límites por host los pone `limiter` (por defecto
+    `host_limiter`, compartido entre fuentes). `deadline` es un instante de
+    `time.monotonic()` a partir del cual se abandonan los trabajos pendientes.
+
+    `download_pool`/`parse_pool` permiten compartir los pools entre varias fuentes; si no
+    se pasan, se crean y se cierran aquí. `source` etiqueta las métricas.
+
+    Con el pool de análisis compartido, cada llamada deja como mucho `max_parse_backlog`
+    análisis pendientes (por defecto, dos por núcleo) y no descarga más hasta que baja:
+    así una fuente con muchos artículos no llena la cola del pool por delante de las
+    demás, y los procesos libres van tomando trabajo de todas las fuentes a la vez.
+
+    `remaining` es una función que devuelve cuántos artículos más necesita el consumidor
+    (None, sin límite): nunca hay más descargas y análisis en curso que ese número, y se
+    lanzan otros a medida que el consumidor descarta resultados. Así una cuota de tres
+    artículos no provoca `max_in_flight` descargas.
+
+    Si el servidor responde 304 y el artículo ya se analizó, se reutiliza el resultado
+    guardado en la caché HTTP sin volver a analizarlo.
+
+    Genera tuplas `(url, ParsedArticle)` en orden de finalización.
+    Si el consumidor deja de iterar, los trabajos pendientes se cancelan.
+    """
+    limiter = limiter or host_limiter
+    max_parse_backlog = max_parse_backlog or 2 * (parse_workers or os.cpu_count() or 1)
+    pending = deque(urls)
+    downloads = {}
+    parses = {}
+    own_download_pool = download_pool is None
+    own_parse_pool = parse_pool is None
+    if own_download_pool:
+        download_pool = ThreadPoolExecutor(max_workers=max_in_flight)
+    if own_parse_pool:
+        parse_pool = create_parse_pool(parse_workers)
+    try:
+        while pending or downloads or parses:
+            timeout = None
+            if deadline is not None:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    logging.warning(f"Plazo agotado: se abandonan {len(pending) + len(downloads) + len(parses)} artículos pendientes.")
+                    return
+
+            # Lanza descargas mientras haya hueco global, por host y en la cuota, sin saltarse el orden de cada host
+            wanted = remaining() if remaining is not None else None
+            if wanted is not None and wanted <= 0 and not downloads and not parses:
+                return
+            blocked_hosts = set()
+            retry_in = None
+            for _ in range(len(pending)):
+                if len(downloads) >= max_in_flight or len(parses) >= max_parse_backlog:
+                    break
+                if wanted is not None and len(downloads) + len(parses) >= wanted:
+                    break
+                url = pending.popleft()
+                host = urlparse(url).netloc
+                acquired, host_retry_in = (False, None) if host in blocked_hosts else limiter.try_acquire(host)
+                if not acquired:
+                    blocked_hosts.add(host)
+                    if host_retry_in is not None:
+                        retry_in = host_retry_in if retry_in is None else min(retry_in, host_retry_in)
+                    pending.append(url)
+                    continue
+                downloads[download_pool.submit(_download, url, source)] = url
+
+            if not downloads and not parses:
+                # Solo queda esperar a que un host vuelva a admitir peticiones. Si está lleno
+                # por descargas de otra fuente no hay plazo conocido: se mira de nuevo en breve
+                pause = retry_in if retry_in is not None else HOST_POLL_INTERVAL
+                time.sleep(pause if timeout is None else min(timeout, pause))
+                continue
+            if retry_in is not None:
+                timeout = retry_in if timeout is None else min(timeout, retry_in)
+
+            done, _ = wait(list(downloads) + list(parses), timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in downloads:
+                    url = downloads.pop(future)
+                    limiter.release(urlparse(url).netloc)
+                    response = future.result()
+                    cached = _load_extracted(url) if response is not None and response.not_modified else None
+                    if cached is not None:
+                        yield url, cached
+                    elif response is not None:
+                        parses[parse_pool.submit(parse_article_html, url, response.text)] = url
+                    else:
+                        yield url, FAILED
+                else:
+                    url = parses.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logging.exception(f"Error en el proceso de análisis para {url}: {e}")
+                        result = FAILED
+                    for stage, seconds in result.timings.items():
+                        metrics.observe(stage, seconds, source)
+                    _store_extracted(url, result)
+                    yield url, result
+    finally:
+        for future, url in downloads.items():
+            # Las descargas ya en marcha liberan su hueco al terminar
+            if future.cancel():
+                limiter.release(urlparse(url).netloc)
+            else:
+                future.add_done_callback(lambda _, host=urlparse(url).netloc: limiter.release(host))
+        for future in parses:
+            future.cancel()
+        if own_download_pool:
+            download_pool.shutdown(wait=False, cancel_futures=True)
+        if own_parse_pool:
+            parse_pool.shutdown(wait=False, cancel_futures=True)
+
+def reparse_archived(page, refresh_summary=False):
+    """Vuelve a analizar una página del archivo HTML (`archive.ArchivedPage`) sin red.
+
+    Se ejecuta en los procesos de análisis: cada uno lee el archivo por su cuenta con
+    mmap, así que el HTML no viaja entre procesos.
+    """
+    try:
+        html = get_archive().read_text(page)
+    except Exception as e:
+        logging.error(f"No se pudo leer el HTML archivado de {page.url}: {e}")
+        return FAILED
+    if html is None:
+        logging.warning(f"El HTML archivado de {page.url} no está en el paquete.")
+        return FAILED
+    return parse_article_html(page.url, html, refresh_summary)
+
+def reprocess_pages(pages, parse_pool, chunksize=8, refresh_summary=False):
+    """Analiza de nuevo las páginas archivadas en `parse_pool`.
+
+    Actualiza los datos extraídos guardados en la caché HTTP y genera tuplas
+    `(ArchivedPage, ParsedArticle)` en el orden de `pages`. Con `refresh_summary` los
+    resúmenes se recalculan sin leer la caché de resúmenes.
+    """
+    pages = list(pages)
+    reparse = partial(reparse_archived, refresh_summary=refresh_summary) if refresh_summary else reparse_archived
+    for page, result in zip(pages, parse_pool.map(reparse, pages, chunksize=chunksize)):
+        for stage, seconds in result.timings.items():
+            metrics.observe(stage, seconds, page.source or "")
+        _store_extracted(page.url, result)
+        yield page, result
@@ -0,0 +1,188 @@
+import codecs
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from http_client import get_client
+
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([\w.:-]+)""", re.I)
+
+def header_encoding(response):
+    """Codificación indicada en el `Content-Type`, o None si no trae `charset`.
+
+    requests supone ISO-8859-1 para cualquier `text/*` sin `charset`, lo que convierte
+    en mojibake las páginas en UTF-8; sin cabecera se decide por el contenido.
+    """
+    if "charset" not in response.headers.get("Content-Type", "").lower():
+        return None
+    return response.encoding
+
+def sniff_encoding(content):
+    """Codificación de un HTML por su `<meta charset>`; si no lo tiene, UTF-8 o Windows-1252."""
+    match = _META_CHARSET.search(content[:4096])
+    if match:
+        try:
+            return codecs.lookup(match.group(1).decode("ascii")).name
+        except (LookupError, UnicodeDecodeError):
+            pass
+    try:
+        content.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "windows-1252"
+
+class CachedResponse:
+    """Respuesta HTTP servida desde la red o desde la caché tras un 304."""
+
+    def __init__(self, url, status_code, content, encoding, not_modified):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.encoding = encoding
+        self.not_modified = not_modified
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or sniff_encoding(self.content), errors="replace")
+
+class HttpCache:
+    """Caché HTTP persistente en disco con peticiones condicionales.
+
+    Guarda el cuerpo de cada respuesta junto con su ETag/Last-Modified y, en la siguiente
+    petición, envía `If-None-Match`/`If-Modified-Since`. Si el servidor contesta 304 se
+    devuelve el cuerpo guardado. El tamaño total está acotado por `max_bytes`: al
+    superarlo se expulsan las entradas usadas hace más tiempo (LRU).
+
+    Cada entrada admite metadatos libres (`get_meta`/`set_meta`) para que el llamador
+    guarde resultados derivados, como los datos ya extraídos del artículo.
+    """
+
+    def __init__(self, directory=None, max_bytes=100 * 1024 * 1024):
+        self.directory = directory or os.environ.get("HTTP_CACHE_DIR", ".cache/http")
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index_path = os.path.join(self.directory, "index.json")
+        os.makedirs(self.directory, exist_ok=True)
+        self._entries = OrderedDict()
+        try:
+            with open(self._index_path, encoding="utf-8") as f:
+                for url, entry in json.load(f):
+                    self._entries[url] = entry
+        except (OSError, ValueError):
+            pass
+        self._size = sum(entry["size"] for entry in self._entries.values())
+
+    def _body_path(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url.encode("utf-8")).hexdigest())
+
+    def _save_index(self):
+        tmp_path = self._index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(list(self._entries.items()), f, ensure_ascii=False)
+        os.replace(tmp_path, self._index_path)
+
+    def _evict(self):
+        while self._size > self.max_bytes and self._entries:
+            url, entry = self._entries.popitem(last=False)
+            self._size -= entry["size"]
+            try:
+                os.remove(self._body_path(url))
+            except OSError:
+                pass
+            logging.info(f"Caché HTTP: expulsado {url}")
+
+    def get(self, url, headers=None, timeout=15, client=None):
+        """Hace un GET condicional y devuelve un `CachedResponse`.
+
+        Por defecto usa el cliente HTTP compartido (`http_client.get_client()`).
+        """
+        request_headers = dict(headers or {})
+        with self._lock:
+            entry = self._entries.get(url)
+        if entry is not None:
+            if entry.get("etag"):
+                request_headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                request_headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = (client or get_client()).get(url, headers=request_headers, timeout=timeout)
+        if response.status_code == 304 and entry is not None:
+            try:
+                with open(self._body_path(url), "rb") as f:
+                    content = f.read()
+            except OSError:
+                content = None
+            if content is not None:
+                with self._lock:
+                    if url in self._entries:
+                        self._entries.move_to_end(url)
+                logging.info(f"Caché HTTP: {url} sin cambios (304)")
+                encoding = entry.get("encoding")
+                if encoding and encoding.lower() == "iso-8859-1":
+                    # Entradas anteriores guardaban el ISO-8859-1 que supone requests sin `charset`.
+                    # Deducirlo del contenido da lo mismo cuando la cabecera sí lo decía
+                    encoding = None
+                return CachedResponse(url, 200, content, encoding, True)
+            # El cuerpo desapareció del disco: se repite la petición sin condiciones
+            self.invalidate(url)
+            return self.get(url, headers=headers, timeout=timeout, client=client)
+
+        content = response.content
+        encoding = header_encoding(response) # None: se deduce del contenido al decodificar
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            with self._lock:
+                old = self._entries.pop(url, None)
+                if old is not None:
+                    self._size -= old["size"]
+                with open(self._body_path(url), "wb") as f:
+                    f.write(content)
+                self._entries[url] = {"etag": etag, "last_modified": last_modified, "encoding": encoding, "size": len(content), "meta": {}}
+                self._size += len(content)
+                self._evict()
+                self._save_index()
+        else:
+            self.invalidate(url)
+        return CachedResponse(url, response.status_code, content, encoding, False)
+
+    def invalidate(self, url):
+        """Elimina una entrada. Devuelve True si existía."""
+        with self._lock:
+            entry = self._entries.pop(url, None)
+            if entry is None:
+                return False
+            self._size -= entry["size"]
+            self._save_index()
+        try:
+            os.remove(self._body_path(url))
+        except OSError:
+            pass
+        return True
+
+    def get_meta(self, url, key):
+        with self._lock:
+            entry = self._entries.get(url)
+            return entry["meta"].get(key) if entry else None
+
+    def set_meta(self, url, key, value):
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                entry["meta"][key] = value
+                self._save_index()
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_cache():
+    """Devuelve la caché compartida del proceso, creándola la primera vez."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = HttpCache()
+        return _default_cache
@@ -0,0 +1,171 @@
+import logging
+import os
+import random
+import threading
+import time
+
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from rate_limiter import host_limiter, parse_retry_after
+
+try:
+    import httpx
+except ImportError: # HTTP/2 es opcional
+    httpx = None
+
+try:
+    import brotli # noqa: F401 (urllib3/httpx lo usan para decodificar "br")
+    _ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi # noqa: F401
+        _ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        _ACCEPT_ENCODING = "gzip, deflate"
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9",
+    "Accept-Encoding": _ACCEPT_ENCODING,
+}
+
+class RetryPolicy:
+    """Política de reintentos con espera exponencial y jitter.
+
+    Solo se espera entre intentos fallidos: un intento correcto vuelve de inmediato.
+    Los códigos de `give_up_statuses` (p. ej. 403) no se reintentan. Si la respuesta trae
+    `Retry-After` se espera al menos eso, y si supera `max_delay` no se reintenta.
+    """
+
+    def __init__(self, max_retries=3, backoff_factor=1.0, max_delay=60.0, retry_statuses=(429, 500, 502, 503, 504), give_up_statuses=(403,)):
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_delay = max_delay
+        self.retry_statuses = frozenset(retry_statuses)
+        self.give_up_statuses = frozenset(give_up_statuses)
+
+    def delay(self, attempt, error=None):
+        """Segundos de espera antes del intento `attempt + 1`."""
+        delay = min(self.backoff_factor * (2 ** attempt) + random.random(), self.max_delay)
+        return max(delay, _retry_after(error) or 0.0)
+
+    def should_retry(self, attempt, error):
+        if attempt + 1 >= self.max_retries:
+            return False
+        if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+            status = error.response.status_code
+            if (_retry_after(error) or 0.0) > self.max_delay:
+                return False
+            return status in self.retry_statuses and status not in self.give_up_statuses
+        return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+    def call(self, func, *args, **kwargs):
+        """Ejecuta `func` reintentando según la política. Relanza el último error."""
+        attempt = 0
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except requests.exceptions.RequestException as e:
+                if not self.should_retry(attempt, e):
+                    raise
+                delay = self.delay(attempt, e)
+                logging.warning(f"Intento {attempt + 1} fallido: {e}. Esperando {delay:.2f} segundos...")
+                time.sleep(delay)
+                attempt += 1
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    return parse_retry_after(response.headers.get("Retry-After")) if response is not None else None
+
+class HttpClient:
+    """Cliente HTTP compartido con pool de conexiones, keep-alive y reintentos.
+
+    Usa una `requests.Session` con un `HTTPAdapter` dimensionado para la concurrencia del
+    fetcher. Con `http2=True` y `httpx[http2]` instalado, las peticiones van por HTTP/2;
+    en ambos casos `get()` devuelve un `requests.Response` y lanza excepciones de
+    `requests`, así que los llamadores no dependen del transporte.
+
+    Cada intento se notifica a `limiter` (por defecto `rate_limiter.host_limiter`) con su
+    código y su latencia, para que ajuste el ritmo del host.
+    """
+
+    def __init__(self, retry_policy=None, pool_size=20, http2=False, headers=None, limiter=None):
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.limiter = limiter or host_limiter
+        self.headers = dict(DEFAULT_HEADERS if headers is None else headers)
+        self._httpx = None
+        if http2 and httpx is not None:
+            try:
+                self._httpx = httpx.Client(http2=True, headers=self.headers, follow_redirects=True, limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size))
+            except ImportError:
+                logging.warning("HTTP/2 no disponible (falta el paquete 'h2'); se usa HTTP/1.1.")
+        elif http2:
+            logging.warning("HTTP/2 no disponible (falta 'httpx'); se usa HTTP/1.1.")
+        self._session = requests.Session()
+        self._session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def _get_httpx(self, url, headers, timeout):
+        try:
+            raw = self._httpx.get(url, headers=headers, timeout=timeout)
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e))
+        except httpx.HTTPError as e:
+            raise requests.exceptions.ConnectionError(str(e))
+        response = requests.Response()
+        response.status_code = raw.status_code
+        response.headers = CaseInsensitiveDict(raw.headers)
+        response._content = raw.content
+        response.encoding = raw.encoding
+        response.url = str(raw.url)
+        response.reason = raw.reason_phrase
+        return response
+
+    def _get_once(self, url, headers, timeout):
+        host = urlparse(url).netloc
+        start = time.monotonic()
+        try:
+            if self._httpx is not None:
+                response = self._get_httpx(url, headers, timeout)
+            else:
+                response = self._session.get(url, headers=headers, timeout=timeout)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            self.limiter.record(host, None, time.monotonic() - start)
+            raise
+        self.limiter.record(host, response.status_code, time.monotonic() - start, parse_retry_after(response.headers.get("Retry-After")))
+        if response.status_code != 304:
+            response.raise_for_status()
+        return response
+
+    def get(self, url, headers=None, timeout=15, retry_policy=None):
+        """GET con reintentos. `headers` se añaden a las cabeceras por defecto."""
+        policy = retry_policy or self.retry_policy
+        return policy.call(self._get_once, url, headers, timeout)
+
+    def close(self):
+        self._session.close()
+        if self._httpx is not None:
+            self._httpx.close()
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+def get_client():
+    """Devuelve el cliente HTTP compartido del proceso, creándolo la primera vez.
+
+    `SCRAPER_HTTP2=1` activa HTTP/2 y `SCRAPER_MAX_RETRIES` ajusta los reintentos.
+    """
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = HttpClient(
+                retry_policy=RetryPolicy(max_retries=int(os.environ.get("SCRAPER_MAX_RETRIES", "3"))),
+                http2=os.environ.get("SCRAPER_HTTP2") == "1",
+            )
+        return _default_client
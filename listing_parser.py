@@ -0,0 +1,68 @@
+import logging
+from functools import lru_cache
+
+try:
+    from lxml import etree
+    from cssselect import GenericTranslator
+except ImportError: # Sin lxml se usa el camino de BeautifulSoup
+    etree = None
+
+CHUNK_SIZE = 16 * 1024
+
+# Selectores de la página de etiqueta de Wired en Español
+DEFAULT_SELECTORS = {
+    "container": "article",
+    "title": "h3.SummaryItemHedBase-hiFYpQ",
+    "link": "a.SummaryItemHedLink-civMjp",
+}
+
+@lru_cache(maxsize=None)
+def _compile(css):
+    # Relativo al contenedor: busca en el propio elemento y en sus descendientes
+    return etree.XPath(GenericTranslator().css_to_xpath(css, prefix="descendant-or-self::"))
+
+def _iter_listing_items_lxml(content, max_items, selectors, encoding):
+    title_xpath = _compile(selectors["title"])
+    link_xpath = _compile(selectors["link"])
+    parser = etree.HTMLPullParser(events=("end",), tag=selectors["container"], encoding=encoding)
+    seen = 0
+    for offset in range(0, len(content), CHUNK_SIZE):
+        parser.feed(content[offset:offset + CHUNK_SIZE])
+        for _, container in parser.read_events():
+            title_elements = title_xpath(container)
+            link_elements = link_xpath(container)
+            if title_elements and link_elements and link_elements[0].get("href"):
+                yield "".join(title_elements[0].itertext()).strip(), link_elements[0].get("href")
+            seen += 1
+            # Libera lo ya procesado para no construir el árbol completo
+            container.clear()
+            while container.getprevious() is not None:
+                del container.getparent()[0]
+            if seen >= max_items:
+                return
+    parser.close()
+
+def _iter_listing_items_bs4(content, max_items, selectors, encoding):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(content, "html.parser", from_encoding=encoding)
+    for container in soup.select(selectors["container"], limit=max_items):
+        title_element = container.select_one(selectors["title"])
+        link_element = container.select_one(selectors["link"])
+        if title_element and link_element and link_element.get("href"):
+            yield title_element.text.strip(), link_element["href"]
+
+def iter_listing_items(content, max_items=10, selectors=None, encoding=None):
+    """Recorre los primeros `max_items` contenedores de una página de listado.
+
+    Genera `(titulo, href)` por cada contenedor que tenga título y enlace. Con lxml el
+    documento se analiza por trozos y el análisis se detiene al llegar al límite; sin
+    lxml se usa BeautifulSoup. `selectors` son selectores CSS (ver `DEFAULT_SELECTORS`).
+    `encoding` es la codificación de `content`; sin ella, lxml supone ISO-8859-1 si la
+    página no tiene `<meta charset>`.
+    """
+    selectors = selectors or DEFAULT_SELECTORS
+    if etree is None:
+        logging.info("lxml no disponible: se analiza el listado con BeautifulSoup.")
+        return _iter_listing_items_bs4(content, max_items, selectors, encoding)
+    return _iter_listing_items_lxml(content, max_items, selectors, encoding)
@@ -0,0 +1,141 @@
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Límites (segundos) de los buckets del histograma en la exportación Prometheus
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+MAX_SAMPLES = 10000 # Tamaño de la muestra para p50/p95 (muestreo de reservorio)
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def _label(value):
+    return json.dumps(value, ensure_ascii=False)
+
+class Histogram:
+    """Cuenta, suma, buckets y máximo exactos; p50/p95 salen de una muestra uniforme.
+
+    La muestra es un reservorio de `MAX_SAMPLES` valores que sigue renovándose, así que
+    los percentiles no se congelan en procesos largos (modo demonio).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = None
+        self.buckets = [0] * len(BUCKETS)
+        self.samples = []
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(seconds)
+        else:
+            index = random.randrange(self.count)
+            if index < MAX_SAMPLES:
+                self.samples[index] = seconds
+
+    def summary(self):
+        values = sorted(self.samples)
+        return {
+            "count": self.count,
+            "total": self.total,
+            "p50": _percentile(values, 0.50),
+            "p95": _percentile(values, 0.95),
+            "max": self.max,
+        }
+
+class Metrics:
+    """Tiempos por etapa (histogramas) y contadores, etiquetados por fuente.
+
+    Las etapas del pipeline son `listing_fetch`, `listing_parse`, `dedup_check`,
+    `article_download`, `article_parse`, `summarize` e `insert`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = defaultdict(Histogram)
+        self.counters = defaultdict(int)
+        self.started_at = time.time()
+
+    def observe(self, stage, seconds, source=""):
+        with self._lock:
+            self.histograms[(stage, source)].observe(seconds)
+
+    @contextmanager
+    def time(self, stage, source=""):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, source)
+
+    def incr(self, name, source="", value=1):
+        with self._lock:
+            self.counters[(name, source)] += value
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.started_at = time.time()
+
+    def report(self):
+        """Resumen de la ejecución como dict serializable en JSON."""
+        with self._lock:
+            stages = defaultdict(dict)
+            for (stage, source), histogram in sorted(self.histograms.items()):
+                stages[stage][source or "-"] = histogram.summary()
+            counters = defaultdict(dict)
+            for (name, source), value in sorted(self.counters.items()):
+                counters[name][source or "-"] = value
+        return {
+            "started_at": self.started_at,
+            "duration": time.time() - self.started_at,
+            "stages": stages,
+            "counters": counters,
+        }
+
+    def prometheus(self):
+        """Exportación en formato de texto de Prometheus."""
+        lines = []
+        with self._lock:
+            if self.histograms:
+                lines.append("# TYPE scraper_stage_seconds histogram")
+            for (stage, source), histogram in sorted(self.histograms.items()):
+                labels = f"stage={_label(stage)},source={_label(source)}"
+                for bound, count in zip(BUCKETS, histogram.buckets):
+                    lines.append(f'scraper_stage_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'scraper_stage_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f"scraper_stage_seconds_sum{{{labels}}} {histogram.total}")
+                lines.append(f"scraper_stage_seconds_count{{{labels}}} {histogram.count}")
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f"# TYPE scraper_{name}_total counter")
+                for (counter_name, source), value in sorted(self.counters.items()):
+                    if counter_name == name:
+                        lines.append(f"scraper_{name}_total{{source={_label(source)}}} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Escribe el informe: texto Prometheus si `path` acaba en `.prom`, JSON si no."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            if path.endswith(".prom"):
+                f.write(self.prometheus())
+            else:
+                json.dump(self.report(), f, indent=4, ensure_ascii=False)
+
+metrics = Metrics()
@@ -0,0 +1,19 @@
+-- Índice único de `amenazas.enlace`. El scraper escribe con upsert por `enlace`
+-- (writer.BulkWriter) y PostgREST lo rechaza con 42P10 si falta. Se puede ejecutar
+-- varias veces: solo se crea si no hay ya un índice único sobre la columna.
+--
+-- Si la tabla ya tiene enlaces repetidos, hay que eliminarlos antes, por ejemplo:
+--   DELETE FROM amenazas a USING amenazas b WHERE a.enlace = b.enlace AND a.ctid > b.ctid;
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1
+        FROM pg_index i
+        JOIN pg_class t ON t.oid = i.indrelid
+        JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = i.indkey[0]
+        WHERE t.relname = 'amenazas' AND i.indisunique AND i.indnatts = 1 AND a.attname = 'enlace'
+    ) THEN
+        CREATE UNIQUE INDEX amenazas_enlace_key ON amenazas (enlace);
+    END IF;
+END
+$$;
@@ -0,0 +1,20 @@
+-- Índices de lectura para `amenazas`: paginación por cursor, filtros por fuente y fecha
+-- y comprobación de duplicados por título normalizado. Se puede ejecutar varias veces.
+--
+-- En tablas grandes conviene crear los índices con CREATE INDEX CONCURRENTLY, fuera de
+-- una transacción (el editor SQL de Supabase ejecuta cada script en una).
+
+-- Clave estable para desempatar el cursor cuando varias filas comparten fecha
+ALTER TABLE amenazas ADD COLUMN IF NOT EXISTS id bigint GENERATED BY DEFAULT AS IDENTITY;
+
+-- Igual que dedup.normalize_title(): minúsculas y espacios colapsados
+ALTER TABLE amenazas ADD COLUMN IF NOT EXISTS titulo_normalizado text
+    GENERATED ALWAYS AS (lower(regexp_replace(btrim(titulo), '\s+', ' ', 'g'))) STORED;
+
+-- El índice único de `enlace` lo crea 000_amenazas_enlace_unique.sql
+
+CREATE INDEX IF NOT EXISTS amenazas_titulo_normalizado_idx ON amenazas (titulo_normalizado);
+
+-- Orden del cursor de read_api.ArticleReader: fecha descendente (sin fecha al final) e id
+CREATE INDEX IF NOT EXISTS amenazas_fecha_id_idx ON amenazas (fecha_publicacion DESC NULLS LAST, id DESC);
+CREATE INDEX IF NOT EXISTS amenazas_fuente_fecha_id_idx ON amenazas (fuente, fecha_publicacion DESC NULLS LAST, id DESC);
@@ -0,0 +1,98 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+SIMHASH_BITS = 64
+BANDS = 4 # 4 bandas de 16 bits: dos huellas a distancia <= 3 comparten al menos una
+BAND_BITS = SIMHASH_BITS // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+MAX_DISTANCE = 3
+SHINGLE_SIZE = 3
+
+def _feature_hash(feature):
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+
+def simhash(text):
+    """SimHash de 64 bits sobre tríos de palabras del texto. Devuelve None si es muy corto."""
+    words = WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return None
+    features = Counter(" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1))
+    weights = [0] * SIMHASH_BITS
+    for feature, weight in features.items():
+        value = _feature_hash(feature)
+        for bit in range(SIMHASH_BITS):
+            if value >> bit & 1:
+                weights[bit] += weight
+            else:
+                weights[bit] -= weight
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+def _signed(value):
+    # SQLite guarda enteros de 64 bits con signo
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+def _bands(fingerprint):
+    return [(fingerprint >> (band * BAND_BITS)) & BAND_MASK for band in range(BANDS)]
+
+class NearDuplicateIndex:
+    """Índice persistente de huellas SimHash con cubetas LSH por bandas.
+
+    `find()` solo compara con las huellas que comparten alguna banda, así que el coste no
+    crece con el tamaño del índice. Se puede consultar desde los procesos de análisis,
+    antes de resumir el artículo.
+    """
+
+    def __init__(self, path=None, max_distance=MAX_DISTANCE):
+        self.path = path or os.environ.get("NEAR_DUP_PATH", ".cache/near_dup.sqlite")
+        self.max_distance = max_distance
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._local = threading.local()
+
+    def _connection(self):
+        # Una conexión por hilo y por proceso: no se deben heredar conexiones tras un fork
+        pid, connection = getattr(self._local, "connection", (None, None))
+        if connection is None or pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30)
+            columns = ", ".join(f"band{band} INTEGER NOT NULL" for band in range(BANDS))
+            connection.execute(f"CREATE TABLE IF NOT EXISTS fingerprints (url TEXT PRIMARY KEY, simhash INTEGER NOT NULL, {columns})")
+            for band in range(BANDS):
+                connection.execute(f"CREATE INDEX IF NOT EXISTS fingerprints_band{band} ON fingerprints (band{band})")
+            self._local.connection = (os.getpid(), connection)
+        return connection
+
+    def find(self, fingerprint, exclude_url=None):
+        """Devuelve el enlace de un artículo casi idéntico ya indexado, o None."""
+        if fingerprint is None:
+            return None
+        where = " OR ".join(f"band{band} = ?" for band in range(BANDS))
+        rows = self._connection().execute(f"SELECT url, simhash FROM fingerprints WHERE {where}", _bands(fingerprint))
+        for url, other in rows:
+            if url != exclude_url and bin(fingerprint ^ (other & 0xFFFFFFFFFFFFFFFF)).count("1") <= self.max_distance:
+                return url
+        return None
+
+    def add(self, url, fingerprint):
+        if fingerprint is None:
+            return
+        placeholders = ", ".join("?" * (BANDS + 2))
+        with self._connection() as connection:
+            connection.execute(f"INSERT OR REPLACE INTO fingerprints VALUES ({placeholders})", [url, _signed(fingerprint)] + _bands(fingerprint))
+
+    def remove(self, url):
+        with self._connection() as connection:
+            connection.execute("DELETE FROM fingerprints WHERE url = ?", (url,))
+
+_default_index = None
+
+def get_near_dup_index():
+    """Devuelve el índice de casi duplicados del proceso, creándolo la primera vez."""
+    global _default_index
+    if _default_index is None:
+        _default_index = NearDuplicateIndex()
+    return _default_index
@@ -0,0 +1,151 @@
+import gzip
+import json
+import logging
+import os
+import threading
+
+HISTORY_PATH = "data/articles.ndjson"
+RUN_PATH = "data/run.ndjson"
+JSON_PATH = "data/articles.json"
+
+def _fsync_replace(tmp_path, path):
+    with open(tmp_path, "rb+") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+class NdjsonSink:
+    """Escribe artículos en NDJSON según se aceptan, sin acumularlos en memoria.
+
+    Las líneas van a `path + ".part"` y se vuelcan al sistema tras cada escritura; cada
+    `fsync_every` registros (y al cerrar) se hace fsync. `close()` renombra el fichero
+    de forma atómica a `path`. Si el proceso muere antes, el `.part` conserva todas las
+    líneas completas y `recover()` las incorpora en la siguiente ejecución.
+    """
+
+    def __init__(self, path=RUN_PATH, fsync_every=20):
+        self.path = path
+        self.part_path = path + ".part"
+        self.fsync_every = fsync_every
+        self.count = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(self.part_path, "a", encoding="utf-8")
+        self._pending = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def write(self, record):
+        self.write_many([record])
+
+    def write_many(self, records):
+        with self._lock:
+            for record in records:
+                self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                self.count += 1
+                self._pending += 1
+            self._file.flush()
+            if self._pending >= self.fsync_every:
+                os.fsync(self._file.fileno())
+                self._pending = 0
+
+    def _finish(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self.part_path, self.path)
+
+    def rotate(self):
+        """Cierra lo escrito hasta ahora en `path` y sigue en un `.part` nuevo.
+
+        Devuelve cuántos registros contenía el fichero cerrado. El llamador debe
+        consumir `path` (por ejemplo con `merge_ndjson`) antes de la siguiente rotación.
+        """
+        with self._lock:
+            count, self.count = self.count, 0
+            self._finish()
+            self._file = open(self.part_path, "a", encoding="utf-8")
+            self._pending = 0
+        return count
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._finish()
+        return self.path
+
+def iter_ndjson(path):
+    """Recorre los registros de un NDJSON. Ignora una última línea cortada por una caída."""
+    try:
+        f = open(path, encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                logging.warning(f"Línea {number} de {path} incompleta o inválida. Se ignora.")
+
+def merge_ndjson(new_path, history_path=HISTORY_PATH, key="enlace"):
+    """Incorpora los registros de `new_path` al histórico sin cargarlo entero.
+
+    Solo los registros nuevos se guardan en memoria: el histórico se recorre línea a
+    línea, se omiten las versiones antiguas de los enlaces que llegan de nuevo y los
+    nuevos se añaden al final. El resultado sustituye al histórico de forma atómica.
+    Devuelve el número de registros nuevos. El histórico existe siempre al terminar,
+    aunque esté vacío, para que el workflow pueda publicarlo.
+    """
+    new_records = {}
+    for record in iter_ndjson(new_path):
+        new_records[record[key]] = record
+    os.makedirs(os.path.dirname(history_path) or ".", exist_ok=True)
+    if not new_records:
+        if not os.path.exists(history_path):
+            open(history_path, "a", encoding="utf-8").close()
+        return 0
+
+    tmp_path = history_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as out:
+        for record in iter_ndjson(history_path):
+            if record.get(key) not in new_records:
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        for record in new_records.values():
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    _fsync_replace(tmp_path, history_path)
+    logging.info(f"{len(new_records)} artículos incorporados a {history_path}")
+    return len(new_records)
+
+def export_json(ndjson_path, json_path=JSON_PATH, compress=False):
+    """Compacta un NDJSON en un array JSON (y en `.json.gz` si `compress`) por streaming."""
+    targets = [(json_path, open)]
+    if compress:
+        targets.append((json_path + ".gz", gzip.open))
+    for path, opener in targets:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        written = 0
+        with opener(tmp_path, "wt", encoding="utf-8") as out:
+            out.write("[")
+            for record in iter_ndjson(ndjson_path):
+                out.write(",\n" if written else "\n")
+                out.write(json.dumps(record, indent=4, ensure_ascii=False))
+                written += 1
+            out.write("\n]" if written else "]")
+        _fsync_replace(tmp_path, path)
+
+def recover(path=RUN_PATH, history_path=HISTORY_PATH):
+    """Incorpora al histórico lo que dejó escrito una ejecución interrumpida."""
+    recovered = 0
+    for leftover in (path, path + ".part"):
+        if os.path.exists(leftover):
+            count = merge_ndjson(leftover, history_path)
+            logging.warning(f"Recuperados {count} artículos de una ejecución interrumpida ({leftover}).")
+            os.remove(leftover)
+            recovered += count
+    return recovered
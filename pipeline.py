@@ -0,0 +1,247 @@
+import logging
+from datetime import datetime
+
+from dedup import DedupIndex, normalize_title
+from metrics import metrics
+
+# Las etapas importan sus dependencias pesadas (requests, lxml, newspaper...) al usarse,
+# igual que scraper.py, para que importar este módulo sea barato.
+
+BACKFILL_LISTING_ITEMS = 200 # Candidatos por fuente en modo relleno si la fuente no indica otro tope
+
+def check_if_article_exists(dedup_index, title, url=None, source=""):
+    """Comprueba si un artículo con el título (o enlace) dado ya existe en la base de datos."""
+    with metrics.time("dedup_check", source):
+        exists = dedup_index.contains(title=title, url=url)
+    logging.info(f"Verificando existencia por título (normalizado): '{normalize_title(title)}' -> {exists}")
+    return exists
+
+class SupabaseStore:
+    """Destino de las filas aceptadas: upserts por lotes en `amenazas` con `BulkWriter`.
+
+    El índice de duplicados se carga de la misma tabla. `on_written` recibe cada lote
+    escrito (por ejemplo, `NdjsonSink.write_many`).
+    """
+
+    def __init__(self, client, source="", on_written=None):
+        from writer import BulkWriter
+
+        self.client = client
+        self.source = source
+        self.writer = BulkWriter(client, source=source, on_written=on_written)
+
+    def load_dedup(self):
+        try:
+            return DedupIndex.load(self.client, self.source)
+        except Exception as e:
+            logging.error(f"Error al cargar el índice de duplicados: {e}")
+            logging.exception(e)
+            return DedupIndex()
+
+    def add(self, row):
+        self.writer.add(row)
+
+    def close(self):
+        """Vacía lo pendiente y devuelve la lista de `(fila, error)` que no se pudieron escribir."""
+        return self.writer.close()
+
+class LocalStore:
+    """Destino sin base de datos: las filas solo van a `on_written` (el NDJSON de la ejecución).
+
+    Los duplicados se comprueban contra el histórico NDJSON de la fuente.
+    """
+
+    def __init__(self, history_path, source="", on_written=None):
+        self.history_path = history_path
+        self.source = source
+        self.on_written = on_written
+        self.written = 0
+
+    def load_dedup(self):
+        from output import iter_ndjson
+
+        index = DedupIndex()
+        for record in iter_ndjson(self.history_path):
+            if record.get("fuente") == self.source:
+                index.add(record.get("titulo"), record.get("enlace"))
+        logging.info(f"Índice de duplicados local: {len(index.titles)} títulos, {len(index.urls)} enlaces.")
+        return index
+
+    def add(self, row):
+        if self.on_written is not None:
+            self.on_written([row])
+        self.written += 1
+        metrics.incr("rows_written", self.source)
+
+    def close(self):
+        return []
+
+def discover(website, max_items):
+    """Etapa de descubrimiento: candidatos del feed, el sitemap o la página de listado."""
+    from discovery import discover_candidates
+    from rate_limiter import host_limiter
+    from sources import source_host
+
+    with host_limiter.slot(source_host(website)):
+        return discover_candidates(website, max_items)
+
+class SourceRun:
+    """Una pasada de una fuente por el pipeline: discovery → fetch → extract → dedup → store.
+
+    `store` es el destino de las filas (`SupabaseStore` o `LocalStore`). En modo relleno
+    (`backfill`) se ignoran la marca de agua, los enlaces ya vistos y la huella del
+    listado, para recorrer artículos antiguos; el índice de duplicados sigue evitando
+    repetir filas, y el estado de rastreo solo se amplía con lo tratado. Si cambia el
+    filtro de relevancia de la fuente (`min_relevance`, `relevance_terms`), la pasada
+    ignora la marca de agua y la huella del listado para volver a puntuar lo filtrado.
+    """
+
+    def __init__(self, website, store, backfill=False):
+        from crawl_state import get_crawl_state
+
+        self.website = website
+        self.name = website["name"]
+        self.store = store
+        self.backfill = backfill
+        self.crawl_state = get_crawl_state()
+        self.dedup_index = None
+        self.feed_dates = {}
+        self.handled = [] # (enlace, fecha) ya tratados, para el estado de rastreo
+        self.complete = True # Si se trata todo el listado, la marca de agua puede avanzar
+        self.rescore = False # El filtro de relevancia cambió: se recorre el listado sin marca de agua
+
+    def select(self, candidates):
+        """Etapa de selección: estado de rastreo, filtro de relevancia y duplicados por snippet.
+
+        Devuelve los enlaces que hay que descargar.
+        """
+        from relevance import get_matcher, relevance_score
+
+        if self.dedup_index is None:
+            self.dedup_index = self.store.load_dedup()
+        # Filtro previo barato: solo pasan a descarga los candidatos que hablan de amenazas
+        min_relevance = self.website.get("min_relevance")
+        matcher = get_matcher(self.website)
+        scores = [] # (enlace, título, puntuación, aceptado), para el estado de rastreo
+        links = []
+
+        metrics.incr("candidates", self.name, len(candidates))
+        for candidate in candidates:
+            title, link = candidate["title"], candidate["url"]
+            self.feed_dates[link] = candidate["published"]
+
+            if not (self.backfill or self.rescore) and self.crawl_state.reached_watermark(self.name, link, candidate["published"]):
+                logging.info(f"Alcanzado un artículo ya rastreado ({link}). El resto del listado ya se procesó.")
+                break
+            if not self.backfill and self.crawl_state.is_seen(self.name, link):
+                continue
+
+            score = relevance_score(candidate, matcher)
+            relevant = min_relevance is None or score >= min_relevance
+            scores.append((link, title, score, relevant))
+            if not relevant:
+                logging.info(f"'{title}' no supera el filtro de relevancia ({score} < {min_relevance}). Omitiendo.")
+                metrics.incr("relevance_filtered", self.name)
+                continue
+
+            logging.info(f"Título encontrado en snippet: '{title}'")
+            if check_if_article_exists(self.dedup_index, title, link, self.name): # Comprobar duplicado con título del snippet
+                logging.info(f"Artículo con título '{title}' ya existe. Omitiendo.")
+                metrics.incr("duplicates", self.name)
+                self.handled.append((link, candidate["published"]))
+                continue
+
+            logging.info(f"Procesando nuevo artículo con título (snippet): '{title}' y enlace: {link}")
+            links.append(link)
+        self.crawl_state.record_relevance(self.name, scores)
+        return links
+
+    def accept(self, link, parsed, near_dup_index):
+        """Etapa de deduplicación tras la extracción. Devuelve la fila a guardar, o None."""
+        title, summary, publish_date = parsed.title, parsed.summary, parsed.publish_date
+        # Casi duplicado de algo ya guardado (quizá en esta misma ejecución)
+        duplicate_of = parsed.duplicate_of or near_dup_index.find(parsed.simhash, exclude_url=link)
+        if duplicate_of:
+            logging.info(f"El artículo {link} es casi idéntico a {duplicate_of}. Omitiendo.")
+            metrics.incr("near_duplicates", self.name)
+            self.handled.append((link, self.feed_dates.get(link)))
+            return None
+        if not (title and summary): # Verificar que newspaper3k extrajo título y resumen
+            logging.warning(f"No se pudo extraer título o resumen con newspaper3k del enlace: {link}. Omitiendo.")
+            metrics.incr("extraction_failures", self.name)
+            self.complete = False # Se reintentará en la próxima ejecución
+            return None
+        logging.debug("Título del artículo (newspaper3k) RAW: '%s' Bytes: %r", title, title.encode("utf-8"))
+        logging.info(f"Título del artículo (newspaper3k): '{title}'")
+        if check_if_article_exists(self.dedup_index, title, source=self.name): # Doble verificación con título completo por si acaso
+            logging.info(f"Artículo con título (newspaper3k) '{title}' ya existe (segunda verificación). Omitiendo.")
+            metrics.incr("duplicates", self.name)
+            self.handled.append((link, self.feed_dates.get(link)))
+            return None
+
+        publish_date = publish_date or self.feed_dates.get(link)
+        return {
+            "fuente": self.name,
+            "titulo": title,
+            "enlace": link,
+            "resumen": summary,
+            "fecha_publicacion": publish_date.isoformat() if isinstance(publish_date, datetime) else None,
+            "fecha_actualizacion": datetime.utcnow().isoformat()
+        }
+
+    def run(self, num_articles=None, max_listing_items=None, **fetch_options):
+        """Ejecuta todas las etapas y devuelve las filas guardadas.
+
+        `num_articles` es el máximo de artículos nuevos (sin tope si es None) y
+        `fetch_options` se pasan a `fetcher.fetch_articles` (pools, plazo, descargas
+        simultáneas...).
+        """
+        from crawl_state import listing_fingerprint
+        from fetcher import fetch_articles
+        from near_dup import get_near_dup_index
+        from relevance import relevance_config
+
+        candidates = discover(self.website, max_listing_items)
+        fingerprint = listing_fingerprint(candidates)
+        config = relevance_config(self.website)
+        if not self.backfill and self.crawl_state.relevance_changed(self.name, config):
+            # Lo filtrado antes quedó por debajo de la marca de agua y no se marcó como visto
+            logging.info(f"El filtro de relevancia de {self.name} ha cambiado. Se vuelve a puntuar todo el listado.")
+            self.rescore = True
+        if not (self.backfill or self.rescore) and self.crawl_state.listing_unchanged(self.name, fingerprint):
+            logging.info(f"El listado de {self.name} no ha cambiado desde la última ejecución completa. Omitiendo.")
+            metrics.incr("listing_unchanged", self.name)
+            return []
+
+        links = self.select(candidates)
+        # Las descargas se solapan; los resultados llegan en orden de finalización
+        articles = []
+        results_received = 0
+        near_dup_index = get_near_dup_index()
+        # Con cuota, solo se descarga lo que aún puede aceptarse; los descartes dejan hueco a otros
+        remaining = (lambda: num_articles - len(articles)) if num_articles is not None else None
+        for link, parsed in fetch_articles(links, source=self.name, remaining=remaining, **fetch_options):
+            results_received += 1
+            data = self.accept(link, parsed, near_dup_index)
+            if data is None:
+                continue
+            logging.debug("Datos a insertar: %s", data)
+            self.store.add(data) # Se escribe por lotes; el upsert por 'enlace' evita duplicados
+            self.dedup_index.add(data["titulo"], link)
+            near_dup_index.add(link, parsed.simhash)
+            metrics.incr("articles_accepted", self.name)
+            articles.append(data)
+            if num_articles is not None and len(articles) >= num_articles:
+                logging.info(f"Alcanzado el límite de {num_articles} noticias. Deteniendo extracción para {self.name}.")
+                self.complete = False
+                break
+
+        failed_links = {row["enlace"] for row, error in self.store.close()}
+        for link in failed_links:
+            near_dup_index.remove(link)
+        articles = [data for data in articles if data["enlace"] not in failed_links]
+        self.handled.extend((data["enlace"], self.feed_dates.get(data["enlace"])) for data in articles)
+        self.crawl_state.mark_seen(self.name, self.handled)
+        if not self.backfill and self.complete and not failed_links and results_received == len(links):
+            self.crawl_state.complete_run(self.name, fingerprint, candidates[0] if candidates else None, config)
+        return articles
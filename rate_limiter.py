@@ -0,0 +1,280 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+from metrics import metrics
+
+MIN_RATE = 0.05 # Nunca por debajo de una petición cada 20 s
+MAX_RATE_FACTOR = 4.0 # Sin `max_rate`, el ritmo puede subir hasta 4 veces el configurado
+TARGET_LATENCY = 2.0
+FORBIDDEN_LIMIT = 3 # 403 seguidos antes de pausar el host
+FORBIDDEN_COOLDOWN = 300.0
+THROTTLED_RATE = 1.0 # Ritmo de un host sin `rate_limit` que empieza a devolver 429/503
+
+def parse_retry_after(value):
+    """Segundos indicados por una cabecera `Retry-After` (número o fecha HTTP), o None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+class _HostState:
+    def __init__(self, max_concurrent, rate=None, max_rate=None, burst=1.0):
+        self.max_concurrent = max_concurrent
+        self.configured = (rate, max_rate) # Lo indicado en `configure`; base_rate puede cambiar al limitar el host
+        self.base_rate = rate
+        self.rate = rate
+        self.max_rate = max_rate or (rate * MAX_RATE_FACTOR if rate else None)
+        self.robots_rate = None
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.forbidden = 0
+
+    def effective_rate(self):
+        if self.robots_rate is None:
+            return self.rate
+        return self.robots_rate if self.rate is None else min(self.rate, self.robots_rate)
+
+    def refill(self, now):
+        rate = self.effective_rate()
+        if rate:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+
+class HostLimiter:
+    """Límites por host compartidos por todas las fuentes de la ejecución.
+
+    Para cada host acota las descargas simultáneas (`max_concurrent`) y reparte las
+    peticiones con una cubeta de tokens a `rate_limit` peticiones por segundo. El ritmo
+    se adapta con AIMD según lo que informa el cliente HTTP (`record`): baja a la mitad
+    con 429/503/403 y sube poco a poco mientras la latencia es buena, hasta `max_rate`.
+    `Retry-After` pausa el host y el `Crawl-delay` de robots.txt es un tope que no se
+    supera nunca.
+
+    `try_acquire` no bloquea (así reparte `fetcher.fetch_articles` las descargas entre
+    hosts); `acquire`/`slot` esperan en el hilo que llama.
+    """
+
+    def __init__(self, default_max_concurrent=2, target_latency=TARGET_LATENCY):
+        self.default_max_concurrent = default_max_concurrent
+        self.target_latency = target_latency
+        self._hosts = {}
+        self._condition = threading.Condition()
+
+    def _state(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(self.default_max_concurrent)
+        return state
+
+    def configure(self, host, max_concurrent=None, rate_limit=None, max_rate=None, burst=1.0):
+        with self._condition:
+            previous = self._hosts.get(host)
+            state = _HostState(max_concurrent or self.default_max_concurrent, rate_limit, max_rate, burst)
+            if previous is not None:
+                # Se conserva lo aprendido: ritmo adaptado, pausas, robots.txt y peticiones en curso
+                state.in_flight = previous.in_flight
+                state.paused_until = previous.paused_until
+                state.robots_rate = previous.robots_rate
+                if previous.configured == state.configured:
+                    # Incluye el ritmo impuesto a un host sin `rate_limit` tras un 429/503
+                    state.base_rate, state.rate, state.max_rate = previous.base_rate, previous.rate, previous.max_rate
+            self._hosts[host] = state
+
+    def set_crawl_delay(self, host, seconds):
+        """Aplica el `Crawl-delay` (o `Request-rate`) de robots.txt como ritmo máximo."""
+        with self._condition:
+            self._state(host).robots_rate = 1.0 / seconds if seconds else None
+
+    def rate(self, host):
+        with self._condition:
+            return self._state(host).effective_rate()
+
+    def try_acquire(self, host):
+        """Reserva un hueco sin bloquear. Devuelve `(reservado, segundos_hasta_reintentar)`."""
+        with self._condition:
+            state = self._state(host)
+            if state.in_flight >= state.max_concurrent:
+                return False, None
+            now = time.monotonic()
+            if state.paused_until > now:
+                return False, state.paused_until - now
+            state.refill(now)
+            rate = state.effective_rate()
+            if rate:
+                if state.tokens < 1:
+                    return False, (1 - state.tokens) / rate
+                state.tokens -= 1
+            state.in_flight += 1
+            return True, None
+
+    def acquire(self, host):
+        """Reserva un hueco esperando lo necesario."""
+        while True:
+            acquired, retry_in = self.try_acquire(host)
+            if acquired:
+                return
+            with self._condition:
+                self._condition.wait(timeout=retry_in)
+
+    def release(self, host):
+        with self._condition:
+            self._state(host).in_flight -= 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, host):
+        self.acquire(host)
+        try:
+            yield
+        finally:
+            self.release(host)
+
+    def pause(self, host, seconds):
+        with self._condition:
+            state = self._state(host)
+            state.paused_until = max(state.paused_until, time.monotonic() + seconds)
+            state.tokens = 0.0
+
+    def _decrease(self, host, state, factor, reason):
+        if state.rate is None:
+            return
+        previous, state.rate = state.rate, max(MIN_RATE, state.rate * factor)
+        if state.rate < previous:
+            logging.warning(f"{host}: {reason}. Ritmo reducido de {previous:.2f} a {state.rate:.2f} peticiones/s.")
+
+    def record(self, host, status, latency, retry_after=None):
+        """Ajusta el ritmo del host según una respuesta (`status` None si falló la conexión)."""
+        with self._condition:
+            state = self._state(host)
+            if status in (429, 503, 403):
+                metrics.incr("throttled", host)
+                if state.rate is None:
+                    state.base_rate = state.rate = THROTTLED_RATE
+                    state.max_rate = THROTTLED_RATE * MAX_RATE_FACTOR
+                    logging.warning(f"{host}: respuesta {status}. Se limita a {THROTTLED_RATE:.2f} peticiones/s.")
+                else:
+                    self._decrease(host, state, 0.5, f"respuesta {status}")
+                state.tokens = min(state.tokens, 0.0)
+                if retry_after:
+                    state.paused_until = max(state.paused_until, time.monotonic() + retry_after)
+                    logging.warning(f"{host}: Retry-After de {retry_after:.0f} s.")
+                if status == 403:
+                    state.forbidden += 1
+                    if state.forbidden >= FORBIDDEN_LIMIT:
+                        state.paused_until = max(state.paused_until, time.monotonic() + FORBIDDEN_COOLDOWN)
+                        logging.warning(f"{host}: {state.forbidden} respuestas 403 seguidas. Pausado {FORBIDDEN_COOLDOWN:.0f} s.")
+                        state.forbidden = 0
+            elif status is None or status >= 500:
+                self._decrease(host, state, 0.75, "error del servidor o de conexión" if status else "error de conexión")
+            else:
+                state.forbidden = 0
+                if state.rate is not None and state.max_rate and latency is not None:
+                    if latency <= self.target_latency:
+                        # Aumento aditivo: un 10 % del ritmo configurado por respuesta rápida
+                        state.rate = min(state.max_rate, state.rate + 0.1 * state.base_rate)
+                    elif latency > 2 * self.target_latency:
+                        self._decrease(host, state, 0.8, f"latencia de {latency:.1f} s")
+            self._condition.notify_all()
+
+host_limiter = HostLimiter()
+
+def robots_delay(text, user_agent="*"):
+    """Segundos entre peticiones que pide un robots.txt (`Crawl-delay` o `Request-rate`).
+
+    `urllib.robotparser` solo admite retrasos enteros; aquí también valen decimales.
+    """
+    agents, in_rules, delay = set(), False, None
+    for raw in text.splitlines():
+        line = raw.split("#", 1)[0].strip()
+        if ":" not in line:
+            continue
+        field, value = (part.strip() for part in line.split(":", 1))
+        field = field.lower()
+        if field == "user-agent":
+            if in_rules:
+                agents, in_rules = set(), False
+            agents.add(value.lower())
+            continue
+        in_rules = True
+        if user_agent.lower() not in agents:
+            continue
+        try:
+            if field == "crawl-delay":
+                delay = max(delay or 0.0, float(value))
+            elif field == "request-rate":
+                requests_, seconds = value.split("/", 1)
+                delay = max(delay or 0.0, float(seconds.rstrip("smh")) / float(requests_))
+        except (ValueError, ZeroDivisionError):
+            continue
+    return delay
+
+_robots_checked = set()
+_robots_pending = set()
+_robots_condition = threading.Condition()
+
+def _fetch_robots_delay(robots_url, user_agent):
+    """`Crawl-delay` del robots.txt, o None si no lo fija o no existe (4xx salvo 429)."""
+    import requests
+    from http_cache import get_cache
+
+    try:
+        response = get_cache().get(robots_url, timeout=10)
+    except requests.exceptions.HTTPError as e:
+        status = e.response.status_code if e.response is not None else None
+        if status is not None and 400 <= status < 500 and status != 429:
+            return None
+        raise
+    return robots_delay(response.text, user_agent)
+
+def apply_robots(url, limiter=None, user_agent="*"):
+    """Lee el robots.txt del host de `url` (una vez por proceso) y aplica su `Crawl-delay`.
+
+    Se descarga por la caché HTTP condicional, así que en ejecuciones siguientes suele
+    bastar un 304. Un robots.txt inexistente equivale a no tener reglas; si la descarga
+    falla por otro motivo no se aplica ningún tope y se reintenta en la siguiente llamada.
+    Mientras un hilo lo descarga, los demás del mismo host esperan a que termine para
+    no empezar a rastrear sin el tope.
+    """
+    import requests
+
+    limiter = limiter or host_limiter
+    parts = urlparse(url)
+    host = parts.netloc
+    with _robots_condition:
+        if host in _robots_pending:
+            # Si esa descarga falla, no se repite aquí: lo hará la siguiente llamada
+            while host in _robots_pending:
+                _robots_condition.wait()
+            return
+        if host in _robots_checked:
+            return
+        _robots_pending.add(host)
+    try:
+        delay = _fetch_robots_delay(f"{parts.scheme}://{host}/robots.txt", user_agent)
+        if delay:
+            limiter.set_crawl_delay(host, delay)
+            logging.info(f"robots.txt de {host}: una petición cada {delay:.1f} s como máximo.")
+        with _robots_condition:
+            _robots_checked.add(host)
+    except requests.exceptions.RequestException as e:
+        logging.info(f"Sin robots.txt utilizable en {host}: {e}")
+    finally:
+        with _robots_condition:
+            _robots_pending.discard(host)
+            _robots_condition.notify_all()
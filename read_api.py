@@ -0,0 +1,182 @@
+import argparse
+import base64
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from dedup import normalize_title, normalize_url
+
+COLUMNS = "id,fuente,titulo,enlace,resumen,fecha_publicacion"
+MAX_PAGE_SIZE = 100
+_MISSING = object()
+
+class TTLCache:
+    """Caché LRU en memoria cuyas entradas caducan a los `ttl` segundos."""
+
+    def __init__(self, max_entries=256, ttl=60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """El valor guardado, o `default` si no está o ha caducado (un None guardado es válido)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+def _quote(value):
+    """Valor entre comillas para los filtros `or=(...)` de PostgREST."""
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+def encode_cursor(row):
+    payload = json.dumps([row.get("fecha_publicacion"), row["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor):
+    """Devuelve `(fecha_publicacion, id)` del cursor. `ValueError` si no es válido."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        published, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Cursor no válido: {cursor}") from e
+    if not isinstance(row_id, int):
+        raise ValueError(f"Cursor no válido: {cursor}")
+    return published, row_id
+
+class ArticleReader:
+    """Lectura paginada de `amenazas` para los consumidores del feed.
+
+    Las páginas se recorren por cursor (keyset) sobre `(fecha_publicacion, id)`, de la
+    más reciente a la más antigua y con los artículos sin fecha al final: cada página
+    cuesta lo mismo por muy atrás que esté, porque la consulta parte del índice
+    `amenazas_fecha_id_idx` (ver migrations/) en lugar de saltar filas con OFFSET. Las
+    respuestas se guardan en una caché LRU con caducidad, compartida por los hilos.
+
+    `client` solo necesita la interfaz de consulta de PostgREST de supabase-py.
+    """
+
+    def __init__(self, client, table="amenazas", cache=None):
+        self.client = client
+        self.table = table
+        self.cache = cache if cache is not None else TTLCache()
+
+    def _cached(self, key, load):
+        # También se guardan los resultados vacíos (p. ej. un enlace que no existe)
+        result = self.cache.get(key, _MISSING)
+        if result is _MISSING:
+            result = load()
+            self.cache.set(key, result)
+        return result
+
+    def list_articles(self, fuente=None, since=None, until=None, cursor=None, limit=20):
+        """Una página de artículos: `{"items": [...], "next_cursor": str o None}`.
+
+        `since` (incluida) y `until` (excluida) son fechas ISO sobre `fecha_publicacion`;
+        con cualquiera de ellas se omiten los artículos sin fecha. `cursor` es el
+        `next_cursor` de la página anterior.
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        after = decode_cursor(cursor) if cursor else None
+        key = ("list", fuente, since, until, cursor, limit)
+        return self._cached(key, lambda: self._fetch_page(fuente, since, until, after, limit))
+
+    def _fetch_page(self, fuente, since, until, after, limit):
+        query = self.client.table(self.table).select(COLUMNS)
+        if fuente:
+            query = query.eq("fuente", fuente)
+        if since:
+            query = query.gte("fecha_publicacion", since)
+        if until:
+            query = query.lt("fecha_publicacion", until)
+        if after is not None:
+            published, row_id = after
+            if published is None:
+                query = query.is_("fecha_publicacion", "null").lt("id", row_id)
+            else:
+                # Lo que va detrás de la fila del cursor en el orden (fecha desc, id desc), sin fecha al final
+                query = query.or_(
+                    f"fecha_publicacion.lt.{_quote(published)},"
+                    f"and(fecha_publicacion.eq.{_quote(published)},id.lt.{row_id}),"
+                    "fecha_publicacion.is.null"
+                )
+        query = query.order("fecha_publicacion", desc=True, nullsfirst=False).order("id", desc=True)
+        # Se pide una fila de más para saber si hay otra página
+        rows = query.limit(limit + 1).execute().data
+        items = rows[:limit]
+        return {"items": items, "next_cursor": encode_cursor(items[-1]) if len(rows) > limit else None}
+
+    def get_article(self, enlace):
+        """El artículo con ese enlace, o None."""
+        def load():
+            rows = self.client.table(self.table).select(COLUMNS).eq("enlace", enlace).limit(1).execute().data
+            return rows[0] if rows else None
+
+        return self._cached(("get", enlace), load)
+
+    def exists(self, title=None, url=None):
+        """Indica si ya hay un artículo con ese título (normalizado) o enlace.
+
+        Usa la columna indexada `titulo_normalizado` y el índice único de `enlace`; el
+        enlace se compara tal cual y también normalizado. No pasa por la caché.
+        """
+        conditions = []
+        if title:
+            conditions.append(f"titulo_normalizado.eq.{_quote(normalize_title(title))}")
+        if url:
+            conditions.extend(f"enlace.eq.{_quote(value)}" for value in dict.fromkeys((url, normalize_url(url))))
+        if not conditions:
+            return False
+        rows = self.client.table(self.table).select("id").or_(",".join(conditions)).limit(1).execute().data
+        return bool(rows)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consulta paginada de los artículos guardados en Supabase.")
+    parser.add_argument("--fuente", help="solo artículos de esta fuente")
+    parser.add_argument("--desde", help="fecha de publicación mínima (AAAA-MM-DD, incluida)")
+    parser.add_argument("--hasta", help="fecha de publicación máxima (AAAA-MM-DD, excluida)")
+    parser.add_argument("--cursor", help="next_cursor de la página anterior")
+    parser.add_argument("-n", "--limit", type=int, default=20, help=f"artículos por página (máximo {MAX_PAGE_SIZE})")
+    args = parser.parse_args(argv)
+
+    url, key = os.environ.get("SUPABASE_URL"), os.environ.get("SUPABASE_ANON_KEY")
+    if not url or not key:
+        logging.error("URL o clave de Supabase no encontradas en variables de entorno.")
+        sys.exit(1)
+    from supabase import create_client
+
+    reader = ArticleReader(create_client(url, key))
+    try:
+        page = reader.list_articles(args.fuente, args.desde, args.hasta, args.cursor, args.limit)
+    except ValueError as e:
+        parser.error(str(e))
+    json.dump(page, sys.stdout, ensure_ascii=False, indent=2)
+    print()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,115 @@
+import json
+import re
+from collections import deque
+from functools import lru_cache
+from urllib.parse import urlparse
+
+from shards import fold
+
+# Términos de amenazas y su peso. Sin tildes; con `*` final valen como prefijo
+# (`vulnerab*` cubre vulnerabilidad, vulnerabilidades, vulnerable...); sin él, solo la
+# palabra completa. Los términos de varias palabras también valen en URLs (`zero-day`).
+THREAT_TERMS = {
+    "ransomware*": 3, "malware*": 3, "ciberatac*": 3, "ciberdelinc*": 3, "ciberdelit*": 3,
+    "ciberespionaje": 3, "hacke*": 3, "phishing": 3, "vulnerab*": 3, "exploit*": 3,
+    "troyano*": 3, "spyware*": 3, "infostealer*": 3, "botnet*": 3, "ddos": 3,
+    "dia cero": 3, "zero day": 3, "zeroday": 3, "cve": 3, "backdoor*": 3,
+    "puerta trasera": 3, "puertas traseras": 3, "rootkit*": 3, "keylogger*": 3,
+    "robo de datos": 3, "filtracion de datos": 3, "brecha de seguridad": 3, "data breach": 3,
+    "ataque informatico": 3, "ataques informaticos": 3, "secuestro de datos": 3, "apt": 2,
+    "ciberseguridad": 2, "filtracion*": 2, "brecha*": 2, "extorsion*": 2,
+    "contrasena*": 2, "credencial*": 2, "suplantacion*": 2, "estafa*": 2, "fraude*": 2,
+    "parche*": 1, "atac*": 1, "ataq*": 1, "seguridad": 1, "privacidad": 1, "espionaje": 1,
+    "cifrado*": 1, "security": 1, "leak*": 1, "breach*": 1,
+}
+
+# Peso de cada campo del candidato en la puntuación
+FIELD_WEIGHTS = (("title", 2), ("teaser", 1), ("url", 1))
+
+_SEPARATORS = re.compile(r"[\W_]+", re.UNICODE)
+
+def normalize(text):
+    """Minúsculas, sin tildes y con un espacio entre palabras (también al principio y al final)."""
+    return f" {_SEPARATORS.sub(' ', fold(text or '')).strip()} "
+
+class TermMatcher:
+    """Autómata de Aho-Corasick sobre el texto normalizado.
+
+    Encuentra todos los términos en una sola pasada, sin depender de cuántos haya. Los
+    patrones llevan un espacio delante (inicio de palabra) y, si no son prefijos, otro
+    detrás (palabra completa).
+    """
+
+    def __init__(self, terms):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        for term, weight in terms.items():
+            pattern = " " + term[:-1] if term.endswith("*") else " " + term + " "
+            node = 0
+            for char in pattern:
+                child = self._goto[node].get(char)
+                if child is None:
+                    child = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[node][char] = child
+                node = child
+            self._output[node].append((term, weight))
+
+        # Enlaces de fallo por anchura: el sufijo más largo que también es prefijo de algún patrón
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def find(self, text):
+        """Devuelve `{termino: peso}` con los términos presentes en `text` ya normalizado."""
+        found = {}
+        node = 0
+        for char in text:
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for term, weight in self._output[node]:
+                found[term] = weight
+        return found
+
+@lru_cache(maxsize=None)
+def _matcher(extra_terms=()):
+    return TermMatcher(dict(THREAT_TERMS, **dict(extra_terms)))
+
+def get_matcher(source=None):
+    """Autómata con `THREAT_TERMS` más los `relevance_terms` de la fuente, si los tiene."""
+    extra = (source or {}).get("relevance_terms") or {}
+    return _matcher(tuple(sorted((fold(term), weight) for term, weight in extra.items())))
+
+def relevance_config(source):
+    """Umbral y términos propios de la fuente, serializados; None si no filtra.
+
+    El estado de rastreo la guarda para saber si los candidatos filtrados en ejecuciones
+    anteriores deben puntuarse de nuevo.
+    """
+    if source.get("min_relevance") is None:
+        return None
+    return json.dumps([source["min_relevance"], source.get("relevance_terms") or {}], sort_keys=True, ensure_ascii=False)
+
+def relevance_score(candidate, matcher=None):
+    """Puntúa un candidato del listado por su título, su entradilla y la ruta de su URL.
+
+    Cada término cuenta una vez por campo, multiplicado por el peso del campo.
+    """
+    matcher = matcher or get_matcher()
+    fields = {
+        "title": candidate.get("title"),
+        "teaser": candidate.get("teaser"),
+        "url": urlparse(candidate.get("url") or "").path,
+    }
+    return sum(weight * sum(matcher.find(normalize(fields[name])).values()) for name, weight in FIELD_WEIGHTS)
@@ -1,171 +1,379 @@
-import requests
-from bs4 import BeautifulSoup
-from supabase import create_client, Client
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import newspaper
+import argparse
+import importlib
 import logging
 import os
+import sys
 import time
-import random
-import nltk
 import json
 
-# Descarga punkt (solo necesita ejecutarse una vez, pero no hace daño tenerlo aquí)
-try:
-    nltk.data.find('corpora/wordnet')
-except LookupError:
-    nltk.download('wordnet', download_dir='/home/runner/nltk_data')
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt', download_dir='/home/runner/nltk_data')
-try:
-    nltk.data.find('tokenizers/punkt_tab/english.pickle')
-except LookupError:
-    nltk.download('punkt_tab', download_dir='/home/runner/nltk_data')
-
-# Configuración del logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Las dependencias pesadas (requests, bs4, supabase, newspaper...) se importan dentro de
+# las funciones que las usan, para validar la configuración antes de pagar su carga.
+HEAVY_MODULES = ("requests", "bs4", "lxml.html", "supabase", "newspaper", "http_client", "http_cache", "listing_parser", "discovery", "summarizer", "dedup", "writer", "fetcher", "crawl_state", "near_dup", "rate_limiter", "archive", "relevance")
+
+# Configuración del logging (LOG_LEVEL=DEBUG muestra también los datos de cada fila)
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper(), format='%(asctime)s - %(levelname)s - %(message)s')
 
 def extract_article_data(url):
     """Extrae el título, el resumen y la fecha de publicación."""
-    try:
-        article = newspaper.Article(url)
-        article.download()
-        if article.download_state != 2:
-            logging.warning(f"No se pudo descargar el artículo de {url}")
-            return None, None, None
-        article.parse()
-        article.nlp()
-        return article.title, article.summary, article.publish_date
-    except newspaper.article.ArticleException as e:
-        logging.error(f"Error al procesar el artículo {url}: {e}")
-        return None, None, None
-    except Exception as e:
-        logging.exception(f"Error inesperado al procesar {url}: {e}")
+    from fetcher import download_article_html, parse_article_html
+
+    html = download_article_html(url)
+    if not html:
         return None, None, None
+    return tuple(parse_article_html(url, html)[:3])
 
-def check_if_article_exists(supabase, title):
-    """Comprueba si un artículo con el título dado ya existe en la base de datos."""
-    normalized_title = title.lower().strip()
-    logging.info(f"Verificando existencia en DB por título (normalizado): '{normalized_title}'")
-    try:
-        query = supabase.table("amenazas").select("*").eq("titulo", normalized_title) # Construye el objeto de consulta
-        logging.info(f"Título normalizado usado en la consulta: '{normalized_title}'") # Registro del título normalizado
-        response = query.execute() # Ejecuta la consulta
-        logging.info(f"Respuesta de la base de datos para título normalizado '{normalized_title}': {response}")
-        return len(response.data) > 0
-    except Exception as e:
-        logging.error(f"Error al consultar la base de datos: {e}")
-        logging.exception(e)
-        return False
+def check_if_article_exists(dedup_index, title, url=None, source=""):
+    """Comprueba si un artículo con el título (o enlace) dado ya existe en la base de datos.
 
-def scrape_website(website, num_articles_to_scrape=3, max_articles_per_website=10):
-    """Extrae información de un sitio web y devuelve una lista de datos de artículos."""
-    # Configuración de Supabase
-    logging.info("Comprobando variables de entorno...")
-    SUPABASE_URL = os.environ.get("SUPABASE_URL")
-    SUPABASE_ANON_KEY = os.environ.get("SUPABASE_ANON_KEY")
+    `dedup_index` es un `dedup.DedupIndex`. Como en versiones anteriores, también se
+    admite un cliente de Supabase: entonces se carga el índice de la tabla en cada
+    llamada, así que con varias comprobaciones conviene cargarlo una vez con
+    `DedupIndex.load` y pasarlo aquí.
+    """
+    from dedup import DedupIndex
+    from pipeline import check_if_article_exists as check_index
+
+    if not isinstance(dedup_index, DedupIndex):
+        try:
+            dedup_index = DedupIndex.load(dedup_index)
+        except Exception as e:
+            logging.error(f"Error al consultar la base de datos: {e}")
+            logging.exception(e)
+            return False
+    return check_index(dedup_index, title, url, source)
 
-    if not SUPABASE_URL or not SUPABASE_ANON_KEY:
+def load_config():
+    """Lee y valida la configuración del entorno. Devuelve None si falta algo."""
+    logging.info("Comprobando variables de entorno...")
+    config = {
+        "supabase_url": os.environ.get("SUPABASE_URL"),
+        "supabase_key": os.environ.get("SUPABASE_ANON_KEY"),
+    }
+    if not config["supabase_url"] or not config["supabase_key"]:
         logging.error("URL o clave de Supabase no encontradas en variables de entorno.")
-        return []
+        return None
+    return config
+
+def create_supabase_client(config):
+    """Crea el cliente de Supabase a partir de la configuración validada."""
+    from supabase import create_client
 
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
+    supabase = create_client(config["supabase_url"], config["supabase_key"])
     logging.info("Conexión a Supabase establecida.")
+    return supabase
 
-    try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9",
-        }
-        response = requests.get(website["url"], headers=headers, timeout=15)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, "html.parser")
-
-        article_containers = soup.find_all("article")[:max_articles_per_website]
-        article_links = []
-        articles_data = []
-        articles_scraped_count = 0
-
-        for article_container in article_containers: # Renombrar variable para claridad
-            if articles_scraped_count >= num_articles_to_scrape:
-                logging.info(f"Alcanzado el límite de {num_articles_to_scrape} noticias. Deteniendo extracción para {website['name']}.")
-                break
-
-            title_element = article_container.find("h3", class_="SummaryItemHedBase-hiFYpQ") # Selector CSS preciso para el título
-            link_element = article_container.find("a", class_="SummaryItemHedLink-civMjp") # Selector CSS preciso para el link
-
-            if title_element and link_element:
-                article_title_snippet = title_element.text.strip() # Extraer título del snippet
-                article_link = link_element['href']
-                if not article_link.startswith("http"):
-                    article_link = "https://es.wired.com" + article_link
-
-                logging.info(f"Título encontrado en snippet: '{article_title_snippet}'")
-
-                if check_if_article_exists(supabase, article_title_snippet): # Comprobar duplicado con título del snippet
-                    logging.info(f"Artículo con título '{article_title_snippet}' ya existe. Omitiendo.")
-                    continue # Saltar al siguiente artículo si ya existe
-
-                logging.info(f"Procesando nuevo artículo con título (snippet): '{article_title_snippet}' y enlace: {article_link}")
-
-                title, summary, publish_date = extract_article_data(article_link) # Extraer datos completos
-                if title and summary: # Verificar que newspaper3k extrajo título y resumen
-                    logging.info(f"Título del artículo (newspaper3k) RAW: '{title}' Bytes: {title.encode('utf-8')}") # NUEVO LOG: Título RAW y Bytes
-                    logging.info(f"Título del artículo (newspaper3k): '{title}'") # Log del título de newspaper3k (normalizado antes en check_if_exists)
-                    if check_if_article_exists(supabase, title): # Doble verificación con título completo por si acaso
-                        logging.info(f"Artículo con título (newspaper3k) '{title}' ya existe (segunda verificación). Omitiendo.")
-                        continue
+def scrape_website(website, num_articles_to_scrape=None, max_articles_per_website=None, max_in_flight=8, deadline=None, supabase=None, download_pool=None, parse_pool=None, sink=None, parse_workers=None, store=None, backfill=False):
+    """Extrae información de un sitio web y devuelve una lista de datos de artículos.
+
+    `website` es una entrada del registro de fuentes (ver `sources.load_sources`); los
+    límites no indicados se toman de ella. Si no se pasa `supabase`, se crea un cliente
+    a partir de las variables de entorno. Con `sink` (un `output.NdjsonSink`) cada lote
+    escrito en la base de datos se añade también a la salida en disco. `parse_workers`
+    es el tamaño del pool de análisis (compartido o no) y acota los análisis pendientes.
+
+    `store` sustituye el destino por defecto (`pipeline.SupabaseStore`), por ejemplo por
+    un `pipeline.LocalStore`. Con `backfill` se recorre el listado sin tener en cuenta
+    el estado de rastreo ni el límite de artículos nuevos (ver `pipeline.SourceRun`).
+    """
+    import requests
+    from fetcher import host_limiter
+    from pipeline import BACKFILL_LISTING_ITEMS, SourceRun, SupabaseStore
+    from rate_limiter import apply_robots
+    from sources import source_host
 
-                    publish_date_str = publish_date.isoformat() if isinstance(publish_date, datetime) else None
-                    data = {
-                        "fuente": website["name"],
-                        "titulo": title,
-                        "enlace": article_link,
-                        "resumen": summary,
-                        "fecha_publicacion": publish_date_str,
-                        "fecha_actualizacion": datetime.utcnow().isoformat()
-                    }
-                    logging.info(f"Datos a insertar: {data}")
-                    try:
-                        data_response = supabase.table("amenazas").insert(data, returning="minimal").execute()
-                        logging.info(f"Artículo insertado en la base de datos: {title}")
-                        articles_scraped_count += 1
-                        articles_data.append(data)
-                    except Exception as e:
-                        logging.error(f"Error al insertar en Supabase: {e}")
-                        logging.exception(e)
-                else:
-                    logging.warning(f"No se pudo extraer título o resumen con newspaper3k del enlace: {article_link}. Omitiendo.")
-
-        return articles_data
+    if num_articles_to_scrape is None and not backfill:
+        num_articles_to_scrape = website.get("num_articles", 3)
+    if max_articles_per_website is None:
+        max_articles_per_website = website.get("max_listing_items", BACKFILL_LISTING_ITEMS if backfill else 10)
+    host_limiter.configure(source_host(website), website.get("max_concurrent"), website.get("rate_limit"), website.get("max_rate"))
+    if website.get("robots", True):
+        apply_robots(website["url"]) # Su Crawl-delay es un tope para el ritmo adaptativo
 
+    if store is None:
+        if supabase is None:
+            config = load_config()
+            if config is None:
+                return []
+            supabase = create_supabase_client(config)
+        store = SupabaseStore(supabase, source=website["name"], on_written=sink.write_many if sink is not None else None)
+    try:
+        return SourceRun(website, store, backfill=backfill).run(
+            num_articles_to_scrape, max_articles_per_website, max_in_flight=max_in_flight, deadline=deadline,
+            download_pool=download_pool, parse_pool=parse_pool, parse_workers=parse_workers,
+        )
     except requests.exceptions.RequestException as e:
         logging.error(f"Error de solicitud web para {website['url']}: {e}")
         return []
     except Exception as e:
         logging.exception(f"Error inesperado al procesar {website['url']}: {e}")
         return []
+    finally:
+        store.close()
+
+
+def profile_startup(modules=HEAVY_MODULES):
+    """Importa los módulos pesados uno a uno e informa del tiempo de cada import.
+
+    El tiempo de cada módulo incluye sus dependencias que aún no estuvieran cargadas.
+    """
+    timings = []
+    for name in modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            logging.warning(f"No se pudo importar {name}: {e}")
+            continue
+        timings.append((name, time.perf_counter() - start))
+    total = sum(elapsed for _, elapsed in timings)
+    print(f"{'módulo':<16}{'ms':>10}")
+    for name, elapsed in sorted(timings, key=lambda item: item[1], reverse=True):
+        print(f"{name:<16}{elapsed * 1000:>10.1f}")
+    print(f"{'total':<16}{total * 1000:>10.1f}")
+    return timings
+
+def run_perf_gate(baseline_path, report_path=None):
+    """Ejecuta el benchmark sin red (benchmarks/bench_pipeline.py) contra la base guardada.
+
+    No necesita Supabase ni red: el sitio y PostgREST se simulan en local. Las
+    tolerancias se leen de la clave "tolerances" de la base. Devuelve el código de
+    salida: 0 si no hay regresiones, 1 si las hay y 2 si la base no es válida.
+    """
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+    import bench_pipeline
+
+    argv = ["--gate", "--baseline", baseline_path]
+    if report_path:
+        argv += ["--output", report_path]
+    return bench_pipeline.main(argv)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Extrae noticias de ciberseguridad y las guarda en Supabase.")
+    parser.add_argument("--profile-startup", action="store_true", help="muestra el tiempo de import de cada dependencia pesada y termina")
+    parser.add_argument("--perf-gate", nargs="?", const="benchmarks/baseline.json", metavar="BASE", help="mide el pipeline sin red con los fixtures, lo compara con la base y termina con código 1 si empeora")
+    parser.add_argument("--perf-report", default="data/perf_report.json", help="con --perf-gate, dónde guardar las mediciones")
+    parser.add_argument("--sources", help="registro de fuentes (por defecto sources.json o $SCRAPER_SOURCES)")
+    parser.add_argument("--source-workers", type=int, default=4, help="fuentes que se procesan en paralelo")
+    parser.add_argument("--workers", type=int, help="procesos de análisis compartidos por todas las fuentes (por defecto, uno por núcleo)")
+    parser.add_argument("--max-in-flight", type=int, default=8, help="descargas de artículos simultáneas")
+    parser.add_argument("--timeout", type=int, default=600, help="plazo global de la ejecución en segundos (en modo servicio, por fuente)")
+    parser.add_argument("--daemon", action="store_true", help="se queda en ejecución y lanza cada fuente según su 'interval'/'jitter'")
+    parser.add_argument("--backfill", action="store_true", help="recorre el listado completo (hasta --max-items) sin estado de rastreo ni límite de artículos nuevos")
+    parser.add_argument("--max-items", type=int, help="candidatos por fuente (por defecto 'max_listing_items' de la fuente)")
+    parser.add_argument("--store", choices=("supabase", "local"), default="supabase", help="destino de los artículos: Supabase o solo el histórico local, sin base de datos")
+    parser.add_argument("--health-port", type=int, help="en modo servicio, puerto de /health y /metrics")
+    parser.add_argument("--history", default="data/articles.ndjson", help="histórico NDJSON al que se incorporan los artículos de cada ejecución")
+    parser.add_argument("--gzip", action="store_true", help="escribe también data/articles.json.gz")
+    parser.add_argument("--reprocess", action="store_true", help="vuelve a analizar el HTML archivado de los artículos guardados y actualiza sus filas, sin descargar nada")
+    parser.add_argument("--since", help="con --reprocess, solo páginas archivadas desde esta fecha (AAAA-MM-DD)")
+    parser.add_argument("--metrics-out", default="data/run_report.json", help="informe de tiempos por etapa y contadores (.prom para formato Prometheus)")
+    args = parser.parse_args(argv)
+    if args.backfill and args.daemon:
+        parser.error("--backfill es una pasada única; no se puede combinar con --daemon")
+    return args
+
+def main(argv=None):
+    """Función principal.
 
+    Sin opciones hace una pasada por todas las fuentes; `--daemon` las repite según su
+    intervalo, `--backfill` recorre listados antiguos y `--reprocess` vuelve a analizar
+    el HTML archivado.
+    """
+    args = parse_args(argv)
+    if args.profile_startup:
+        profile_startup()
+        return
+    if args.perf_gate:
+        sys.exit(run_perf_gate(args.perf_gate, args.perf_report))
 
-def main():
-    """Función principal."""
-    WEBSITES = [
-        {"name": "Wired en Español", "url": "https://es.wired.com/tag/ciberseguridad"}
-    ]
-    all_articles = []
-    num_articles_per_run = 3
-    for website in WEBSITES:
+    supabase = None
+    if args.store == "supabase" or args.reprocess:
+        config = load_config() # Se valida antes de importar nada pesado
+        if config is None:
+            sys.exit(1)
+        supabase = create_supabase_client(config)
+
+    if args.reprocess:
+        reprocess_archive(supabase, args.history, since=args.since, workers=args.workers)
+        write_run_report(args.metrics_out)
+        return
+
+    from sources import interleave_by_host, load_sources
+
+    try:
+        websites = interleave_by_host(load_sources(args.sources))
+    except (OSError, ValueError) as e:
+        logging.error(f"No se pudo cargar el registro de fuentes: {e}")
+        sys.exit(1)
+
+    from fetcher import create_parse_pool
+    from output import NdjsonSink, recover
+    from pipeline import LocalStore
+
+    def scrape(website, deadline=None):
         logging.info(f"Extrayendo noticias de: {website['name']}")
-        articles = scrape_website(website, num_articles_to_scrape=num_articles_per_run)
-        all_articles.extend(articles)
+        deadline = deadline or time.monotonic() + args.timeout
+        store = LocalStore(args.history, source=website["name"], on_written=sink.write_many) if args.store == "local" else None
+        articles = scrape_website(
+            website, max_articles_per_website=args.max_items, max_in_flight=args.max_in_flight, deadline=deadline, supabase=supabase,
+            download_pool=download_pool, parse_pool=parse_pool, sink=sink, parse_workers=args.workers, store=store, backfill=args.backfill,
+        )
         logging.info(f"Extracción de {website['name']} finalizada.")
+        return articles
+
+    recover(history_path=args.history) # Lo que dejara una ejecución interrumpida
+    # Los artículos se escriben en disco según se guardan; no se acumulan en memoria
+    sink = NdjsonSink()
+    try:
+        # Los pools de descarga y análisis se comparten; los límites por host los pone host_limiter.
+        # Los procesos de análisis toman el siguiente artículo de cualquier fuente.
+        with ThreadPoolExecutor(max_workers=args.max_in_flight) as download_pool, create_parse_pool(args.workers) as parse_pool:
+            if args.daemon:
+                run_daemon_mode(websites, scrape, sink, args)
+                return
+
+            deadline = time.monotonic() + args.timeout # Plazo global para toda la ejecución
+            with ThreadPoolExecutor(max_workers=args.source_workers) as source_pool:
+                for _ in source_pool.map(lambda website: scrape(website, deadline), websites):
+                    pass
+    finally:
+        sink.close()
+
+    logging.info(f"Extracción completada para todos los sitios: {sink.count} artículos nuevos.")
+    publish_run(sink.path, args.history, compress=args.gzip)
+    write_run_report(args.metrics_out)
+
+def publish_run(run_path, history_path, json_path="data/articles.json", compress=False):
+    """Incorpora los artículos de la ejecución al histórico y los publica.
+
+    Actualiza el histórico NDJSON, las particiones paginadas que lee index.html (solo si
+    hay artículos nuevos o aún no existen), el índice de búsqueda local y `json_path`
+    con los de esta ejecución.
+    """
+    from output import export_json, merge_ndjson
+    from search_index import update_search_index
+    from shards import export_shards
+
+    out_dir = os.path.dirname(json_path) or "."
+    new_records = merge_ndjson(run_path, history_path)
+    if new_records or not os.path.exists(os.path.join(out_dir, "manifest.json")):
+        export_shards(history_path, out_dir)
+    if new_records:
+        update_search_index(run_path, history_path)
+    export_json(run_path, json_path, compress=compress)
+    os.remove(run_path)
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def reprocess_archive(supabase, history_path, since=None, workers=None, chunk_size=256):
+    """Vuelve a extraer los artículos del histórico a partir del HTML archivado.
+
+    No descarga nada: para cada enlace del histórico toma su última versión archivada,
+    la analiza de nuevo en un pool de procesos (recalculando el resumen) y actualiza en
+    la base de datos y en el histórico las filas cuyo título, resumen o fecha cambian.
+    El histórico se recorre por bloques, sin cargarlo entero. Devuelve las filas
+    actualizadas.
+    """
+    from archive import get_archive
+    from fetcher import create_parse_pool, reprocess_pages
+    from output import NdjsonSink, iter_ndjson, merge_ndjson, recover
+    from search_index import update_search_index
+    from shards import export_shards
+    from writer import BulkWriter
+
+    reprocess_path = os.path.join(os.path.dirname(history_path) or ".", "reprocess.ndjson")
+    recover(reprocess_path, history_path)
+    archive = get_archive()
+    counts = {"archived": 0, "updated": 0, "unchanged": 0, "failed": 0}
+    with NdjsonSink(reprocess_path) as sink, create_parse_pool(workers) as parse_pool:
+        writer = BulkWriter(supabase, source="reprocess", on_written=sink.write_many, ignore_duplicates=False)
+        try:
+            for chunk in _chunks(iter_ndjson(history_path), chunk_size):
+                records = {record["enlace"]: record for record in chunk if record.get("enlace")}
+                pages = [page for page in map(archive.latest, records) if page and (not since or page.fetched_at >= since)]
+                counts["archived"] += len(pages)
+                for page, parsed in reprocess_pages(pages, parse_pool, refresh_summary=True):
+                    record = records[page.url]
+                    if not (parsed.title and parsed.summary):
+                        logging.warning(f"No se pudo volver a extraer {page.url}. Se mantiene la fila guardada.")
+                        counts["failed"] += 1
+                        continue
+                    publish_date_str = parsed.publish_date.isoformat() if isinstance(parsed.publish_date, datetime) else record.get("fecha_publicacion")
+                    if (parsed.title, parsed.summary, publish_date_str) == (record.get("titulo"), record.get("resumen"), record.get("fecha_publicacion")):
+                        counts["unchanged"] += 1
+                        continue
+                    writer.add(dict(record, titulo=parsed.title, resumen=parsed.summary, fecha_publicacion=publish_date_str, fecha_actualizacion=datetime.utcnow().isoformat()))
+                    counts["updated"] += 1
+        finally:
+            failed = writer.close()
+    counts["updated"] -= len(failed)
+    logging.info(f"Reprocesado: {counts['archived']} páginas archivadas, {counts['updated']} filas actualizadas, {counts['unchanged']} sin cambios, {counts['failed']} fallidas.")
+    if merge_ndjson(reprocess_path, history_path):
+        export_shards(history_path, os.path.dirname(history_path) or ".")
+        update_search_index(reprocess_path, history_path)
+    os.remove(reprocess_path)
+    return counts["updated"]
+
+def write_articles(articles, path="data/articles.json"):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(articles, f, indent=4, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def write_run_report(path):
+    """Escribe el informe de la ejecución y resume en el log el tiempo por etapa."""
+    from metrics import metrics
+
+    metrics.write(path)
+    for stage, sources in metrics.report()["stages"].items():
+        total = sum(summary["total"] for summary in sources.values())
+        count = sum(summary["count"] for summary in sources.values())
+        logging.info(f"Etapa {stage}: {count} llamadas, {total:.2f} s en total.")
+    logging.info(f"Informe de métricas escrito en {path}")
+
+def run_daemon_mode(websites, scrape, sink, args):
+    """Modo servicio: cada fuente se ejecuta según su intervalo hasta recibir SIGTERM."""
+    import asyncio
+    import threading
+    from daemon import run_daemon
+    from output import merge_ndjson
+    from search_index import update_search_index
+    from shards import export_shards
+
+    latest = {} # Últimos artículos de cada fuente, para data/articles.json
+    publish_lock = threading.Lock()
 
-    logging.info("Extracción completada para todos los sitios.")
+    def run_source(website):
+        articles = scrape(website)
+        with publish_lock:
+            # Lo escrito hasta ahora (también por otras fuentes en curso) pasa al histórico
+            sink.rotate()
+            if merge_ndjson(sink.path, args.history):
+                export_shards(args.history)
+                update_search_index(sink.path, args.history)
+            os.remove(sink.path)
+            if articles:
+                latest[website["name"]] = articles
+                write_articles([article for articles in latest.values() for article in articles])
+        return articles
 
-    with open("data/articles.json", "w", encoding="utf-8") as f:
-        json.dump(all_articles, f, indent=4, ensure_ascii=False)
+    asyncio.run(run_daemon(websites, run_source, health_port=args.health_port, max_concurrent_jobs=args.source_workers))
+    sink.close()
+    if merge_ndjson(sink.path, args.history):
+        update_search_index(sink.path, args.history)
+    os.remove(sink.path)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
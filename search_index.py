@@ -0,0 +1,335 @@
+import argparse
+import hashlib
+import heapq
+import json
+import logging
+import math
+import mmap
+import os
+import sys
+from array import array
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+from output import HISTORY_PATH, iter_ndjson
+from shards import TOKEN_RE, fold
+from summarizer import STOPWORDS
+
+try:
+    from nltk.stem.snowball import SpanishStemmer
+except ImportError:
+    SpanishStemmer = None
+
+INDEX_DIR = ".cache/search"
+MAX_SEGMENTS = 8 # Con más segmentos se fusionan en uno
+TITLE_WEIGHT = 2 # Una palabra del título cuenta como dos del resumen
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+if SpanishStemmer is not None:
+    STEMMER = "snowball-es"
+    _stem = SpanishStemmer().stem
+else:
+    STEMMER = "sufijos-es"
+    _SUFFIXES = ("amientos", "imientos", "aciones", "uciones", "amiento", "imiento", "idades", "adoras", "adores",
+                 "mente", "acion", "ucion", "idad", "ador", "ando", "iendo", "ables", "ibles", "able", "ible",
+                 "istas", "ista", "osos", "osas", "oso", "osa", "es", "os", "as", "s", "a", "o", "e")
+
+    def _stem(word):
+        for suffix in _SUFFIXES:
+            if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+                return word[:-len(suffix)]
+        return word
+
+@lru_cache(maxsize=200000) # El vocabulario se repite mucho: cada palabra se procesa una vez
+def _term(word):
+    if len(word) <= 2 or fold(word) in STOPWORDS:
+        return None
+    return fold(_stem(word))
+
+def analyze(text):
+    """Palabras de `text` listas para indexar: sin vacías, con raíz y sin tildes."""
+    return [term for term in map(_term, TOKEN_RE.findall((text or "").lower())) if term]
+
+def _link_hash(link):
+    return int.from_bytes(hashlib.blake2b(link.encode("utf-8"), digest_size=8).digest(), "little")
+
+def _write_array(path, values):
+    with open(path, "wb") as f:
+        values.tofile(f)
+
+def _map_array(path, typecode):
+    """Vista de solo lectura sobre un fichero de enteros (orden de bytes nativo)."""
+    if os.path.getsize(path) == 0:
+        return memoryview(array(typecode))
+    with open(path, "rb") as f:
+        return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)).cast(typecode)
+
+class _Segment:
+    """Segmento inmutable del índice; solo cambia su lista de documentos borrados."""
+
+    def __init__(self, directory, info):
+        self.info = info
+        self.base = os.path.join(directory, info["name"])
+        with open(self.base + ".terms.json", encoding="utf-8") as f:
+            self.terms = json.load(f)
+        self.postings = _map_array(self.base + ".post", "I")
+        self.offsets = _map_array(self.base + ".offsets", "Q")
+        self.lengths = _map_array(self.base + ".lengths", "I")
+        self.links = _map_array(self.base + ".links", "Q")
+        try:
+            with open(self.base + ".deleted.json", encoding="utf-8") as f:
+                self.deleted = set(json.load(f))
+        except FileNotFoundError:
+            self.deleted = set()
+        with open(self.base + ".docs", "rb") as f:
+            self.docs = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def document(self, doc_id):
+        end = self.docs.find(b"\n", self.offsets[doc_id])
+        return json.loads(self.docs[self.offsets[doc_id]:end])
+
+    def live_documents(self):
+        for doc_id in range(len(self.offsets)):
+            if doc_id not in self.deleted:
+                yield self.document(doc_id)
+
+    def postings_for(self, term):
+        entry = self.terms.get(term)
+        if entry is None:
+            return ()
+        start, df = entry
+        pairs = self.postings[start * 2:(start + df) * 2]
+        return zip(pairs[::2], pairs[1::2])
+
+    def delete(self, link_hashes):
+        """Marca como borrados los documentos con esos enlaces. Devuelve la longitud retirada."""
+        removed, changed = 0, False
+        for doc_id, link_hash in enumerate(self.links):
+            if link_hash in link_hashes and doc_id not in self.deleted:
+                self.deleted.add(doc_id)
+                removed += self.lengths[doc_id]
+                changed = True
+        if changed:
+            tmp_path = self.base + ".deleted.json.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(sorted(self.deleted), f)
+            os.replace(tmp_path, self.base + ".deleted.json")
+        return removed
+
+    def close(self):
+        for view in (self.postings, self.offsets, self.lengths, self.links):
+            view.release()
+        self.docs.close()
+
+class SearchIndex:
+    """Índice invertido local sobre `titulo` y `resumen`, con ranking BM25.
+
+    Se guarda por segmentos inmutables: cada actualización añade uno con los artículos
+    nuevos (los que ya estaban con el mismo enlace se marcan como borrados) y, al pasar
+    de `MAX_SEGMENTS`, se fusionan todos en uno. Las listas de apariciones son arrays
+    de enteros `(documento, frecuencia)` que se leen con mmap, igual que los datos de
+    cada documento, así que una consulta no carga el índice en memoria.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or os.environ.get("SEARCH_INDEX_DIR", INDEX_DIR)
+        self.manifest_path = os.path.join(self.directory, "manifest.json")
+        os.makedirs(self.directory, exist_ok=True)
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        except FileNotFoundError:
+            self.manifest = {"stemmer": STEMMER, "next_segment": 0, "segments": []}
+        if self.manifest["stemmer"] != STEMMER:
+            logging.warning(f"El índice de búsqueda se creó con '{self.manifest['stemmer']}' y ahora se usa '{STEMMER}'. Conviene reconstruirlo con --rebuild.")
+        self._segments = None
+
+    def _save_manifest(self):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def segments(self):
+        if self._segments is None:
+            self._segments = [_Segment(self.directory, info) for info in self.manifest["segments"]]
+        return self._segments
+
+    def close(self):
+        for segment in self._segments or ():
+            segment.close()
+        self._segments = None
+
+    def _write_segment(self, records):
+        """Escribe un segmento con `records` y devuelve su entrada del manifiesto, o None si no hay nada."""
+        name = f"seg-{self.manifest['next_segment']:06d}"
+        base = os.path.join(self.directory, name)
+        offsets, lengths, links = array("Q"), array("I"), array("Q")
+        postings = defaultdict(list)
+        with open(base + ".docs", "wb") as docs:
+            for record in records:
+                if not record.get("enlace"):
+                    continue
+                doc_id = len(offsets)
+                counts = Counter()
+                for term in analyze(record.get("titulo")):
+                    counts[term] += TITLE_WEIGHT
+                counts.update(analyze(record.get("resumen")))
+                for term, tf in counts.items():
+                    postings[term].append((doc_id, tf))
+                offsets.append(docs.tell())
+                lengths.append(sum(counts.values()))
+                links.append(_link_hash(record["enlace"]))
+                document = {key: record.get(key) for key in ("titulo", "enlace", "fuente", "fecha_publicacion", "resumen")}
+                docs.write(json.dumps(document, ensure_ascii=False).encode("utf-8") + b"\n")
+        if not offsets:
+            os.remove(base + ".docs")
+            return None
+
+        terms, flat = {}, array("I")
+        for term in sorted(postings):
+            terms[term] = [len(flat) // 2, len(postings[term])]
+            for doc_id, tf in postings[term]:
+                flat.append(doc_id)
+                flat.append(tf)
+        _write_array(base + ".post", flat)
+        _write_array(base + ".offsets", offsets)
+        _write_array(base + ".lengths", lengths)
+        _write_array(base + ".links", links)
+        with open(base + ".terms.json", "w", encoding="utf-8") as f:
+            json.dump(terms, f, ensure_ascii=False, separators=(",", ":"))
+        self.manifest["next_segment"] += 1
+        return {"name": name, "docs": len(offsets), "live": len(offsets), "length": sum(lengths)}
+
+    def _remove_files(self, name):
+        for suffix in (".docs", ".post", ".offsets", ".lengths", ".links", ".terms.json", ".deleted.json"):
+            try:
+                os.remove(os.path.join(self.directory, name + suffix))
+            except FileNotFoundError:
+                pass
+
+    def add(self, records):
+        """Indexa `records` (dicts como los del histórico). Devuelve cuántos se indexaron."""
+        records = list(records)
+        link_hashes = {_link_hash(record["enlace"]) for record in records if record.get("enlace")}
+        if not link_hashes:
+            return 0
+        for segment in self.segments():
+            removed = segment.delete(link_hashes)
+            segment.info["live"] = segment.info["docs"] - len(segment.deleted)
+            segment.info["length"] -= removed
+        info = self._write_segment(records)
+        self.manifest["segments"].append(info)
+        self._save_manifest()
+        self.close()
+        if len(self.manifest["segments"]) > MAX_SEGMENTS:
+            self.merge()
+        return info["docs"]
+
+    def merge(self):
+        """Fusiona todos los segmentos en uno, descartando los documentos borrados."""
+        old = [info["name"] for info in self.manifest["segments"]]
+        segments = self.segments()
+        info = self._write_segment(document for segment in segments for document in segment.live_documents())
+        self.close()
+        self.manifest["segments"] = [info] if info else []
+        self._save_manifest()
+        for name in old:
+            self._remove_files(name)
+        logging.info(f"Índice de búsqueda fusionado: {len(old)} segmentos en uno.")
+
+    def rebuild(self, history_path=HISTORY_PATH):
+        """Reconstruye el índice desde cero a partir del histórico NDJSON."""
+        old = [info["name"] for info in self.manifest["segments"]]
+        self.close()
+        self.manifest = {"stemmer": STEMMER, "next_segment": self.manifest["next_segment"], "segments": []}
+        info = self._write_segment(iter_ndjson(history_path))
+        if info:
+            self.manifest["segments"].append(info)
+        self._save_manifest()
+        for name in old:
+            self._remove_files(name)
+        return info["docs"] if info else 0
+
+    def search(self, query, limit=10):
+        """Devuelve los `limit` documentos más relevantes para `query` según BM25."""
+        terms = list(dict.fromkeys(analyze(query)))
+        segments = self.segments()
+        total_docs = sum(info["live"] for info in self.manifest["segments"])
+        if not terms or not total_docs:
+            return []
+        average_length = sum(info["length"] for info in self.manifest["segments"]) / total_docs
+        scores = defaultdict(float)
+        for term in terms:
+            # La frecuencia documental incluye los borrados pendientes de fusión
+            df = sum(segment.terms[term][1] for segment in segments if term in segment.terms)
+            idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+            for segment_id, segment in enumerate(segments):
+                for doc_id, tf in segment.postings_for(term):
+                    if doc_id in segment.deleted:
+                        continue
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * segment.lengths[doc_id] / average_length)
+                    scores[segment_id, doc_id] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+        results = []
+        for (segment_id, doc_id), score in heapq.nlargest(limit, scores.items(), key=lambda item: item[1]):
+            document = segments[segment_id].document(doc_id)
+            document["score"] = round(score, 4)
+            results.append(document)
+        return results
+
+def update_search_index(ndjson_path, history_path=HISTORY_PATH, directory=None):
+    """Añade al índice de búsqueda los artículos de un NDJSON ya incorporado al histórico.
+
+    Si el índice aún no existe, se construye con todo el histórico. Un fallo no detiene
+    la publicación.
+    """
+    index = SearchIndex(directory)
+    try:
+        if not index.manifest["segments"]:
+            count = index.rebuild(history_path)
+        else:
+            count = index.add(iter_ndjson(ndjson_path))
+        if count:
+            logging.info(f"{count} artículos añadidos al índice de búsqueda.")
+        return count
+    except (OSError, ValueError) as e:
+        logging.warning(f"No se pudo actualizar el índice de búsqueda: {e}")
+        return 0
+    finally:
+        index.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Busca en los artículos extraídos con el índice local.")
+    parser.add_argument("query", nargs="*", help="palabras a buscar")
+    parser.add_argument("-n", "--limit", type=int, default=10, help="número máximo de resultados")
+    parser.add_argument("--json", action="store_true", help="resultados en JSON")
+    parser.add_argument("--index", help=f"directorio del índice (por defecto {INDEX_DIR} o $SEARCH_INDEX_DIR)")
+    parser.add_argument("--rebuild", action="store_true", help="reconstruye el índice a partir del histórico")
+    parser.add_argument("--history", default=HISTORY_PATH, help="histórico NDJSON para --rebuild")
+    args = parser.parse_args(argv)
+
+    index = SearchIndex(args.index)
+    try:
+        # Tras actualizar el histórico (por ejemplo con git pull) el índice se rehace
+        stale = os.path.exists(args.history) and (not os.path.exists(index.manifest_path) or os.path.getmtime(args.history) > os.path.getmtime(index.manifest_path))
+        if args.rebuild or stale:
+            print(f"{index.rebuild(args.history)} artículos indexados.", file=sys.stderr)
+            if not args.query:
+                return
+        if not args.query:
+            parser.error("indica qué buscar o --rebuild")
+        results = index.search(" ".join(args.query), args.limit)
+    finally:
+        index.close()
+    if args.json:
+        json.dump(results, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+        return
+    for result in results:
+        print(f"{result['score']:7.2f}  {(result.get('fecha_publicacion') or '')[:10]:<10}  {result.get('titulo')}")
+        print(f"{'':9}  {result.get('enlace')}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
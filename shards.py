@@ -0,0 +1,98 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+from collections import defaultdict
+
+from output import HISTORY_PATH, iter_ndjson
+from summarizer import STOPWORDS, fold # noqa: F401 (`fold` se reexporta)
+
+OUT_DIR = "data"
+UNDATED = "sin-fecha"
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+def title_tokens(title):
+    return sorted({token for token in TOKEN_RE.findall(fold(title or "")) if len(token) > 2 and token not in STOPWORDS})
+
+def _record_date(record):
+    return record.get("fecha_publicacion") or record.get("fecha_actualizacion") or ""
+
+def shard_key(record):
+    """Partición mensual (`AAAA-MM`) según la fecha de publicación o, si falta, la de extracción."""
+    date = _record_date(record)
+    return date[:7] if re.match(r"\d{4}-\d{2}", date) else UNDATED
+
+def _write_if_changed(path, payload):
+    """Escribe de forma atómica solo si el contenido cambia. Devuelve el hash del contenido."""
+    data = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    try:
+        with open(path, "rb") as f:
+            if hashlib.sha256(f.read()).hexdigest()[:12] == digest:
+                return digest
+    except FileNotFoundError:
+        pass
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return digest
+
+def export_shards(history_path=HISTORY_PATH, out_dir=OUT_DIR):
+    """Publica el histórico como JSON estático paginado para index.html.
+
+    Genera `shards/AAAA-MM.json` (artículos del mes, del más reciente al más antiguo),
+    `manifest.json` (particiones de la más reciente a la más antigua, con su recuento y
+    el hash de su contenido) y `search.json` (índice invertido de palabras del título).
+    El histórico se reparte en ficheros temporales por mes sin cargarlo entero; solo se
+    reescriben las particiones cuyo contenido cambia.
+    """
+    shards_dir = os.path.join(out_dir, "shards")
+    os.makedirs(shards_dir, exist_ok=True)
+    scratch = tempfile.mkdtemp(dir=out_dir, prefix=".shards-")
+    try:
+        files = {}
+        for record in iter_ndjson(history_path):
+            key = shard_key(record)
+            if key not in files:
+                files[key] = open(os.path.join(scratch, key + ".ndjson"), "w", encoding="utf-8")
+            files[key].write(json.dumps(record, ensure_ascii=False) + "\n")
+        for f in files.values():
+            f.close()
+
+        keys = sorted((key for key in files if key != UNDATED), reverse=True) + ([UNDATED] if UNDATED in files else [])
+        manifest = {"total": 0, "shards": []}
+        documents = []
+        postings = defaultdict(list)
+        for shard_index, key in enumerate(keys):
+            articles = sorted(iter_ndjson(os.path.join(scratch, key + ".ndjson")), key=_record_date, reverse=True)
+            digest = _write_if_changed(os.path.join(shards_dir, key + ".json"), articles)
+            dates = [_record_date(article) for article in articles if _record_date(article)]
+            manifest["shards"].append({
+                "key": key,
+                "path": f"shards/{key}.json",
+                "count": len(articles),
+                "hash": digest,
+                "newest": max(dates) if dates else None,
+                "oldest": min(dates) if dates else None,
+            })
+            manifest["total"] += len(articles)
+            for position, article in enumerate(articles):
+                for token in title_tokens(article.get("titulo")):
+                    postings[token].append(len(documents))
+                documents.append([article.get("titulo"), article.get("enlace"), _record_date(article)[:10], shard_index, position])
+
+        for name in os.listdir(shards_dir):
+            if name.endswith(".json") and name[:-5] not in files:
+                os.remove(os.path.join(shards_dir, name))
+
+        search = {"documents": documents, "tokens": dict(sorted(postings.items())), "stopwords": sorted(STOPWORDS)}
+        manifest["search"] = {"path": "search.json", "hash": _write_if_changed(os.path.join(out_dir, "search.json"), search)}
+        _write_if_changed(os.path.join(out_dir, "manifest.json"), manifest)
+        logging.info(f"Histórico publicado en {len(keys)} particiones ({manifest['total']} artículos).")
+        return manifest
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
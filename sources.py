@@ -0,0 +1,73 @@
+import json
+import logging
+import os
+from collections import OrderedDict, deque
+from urllib.parse import urljoin, urlparse
+
+SOURCES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sources.json")
+
+REQUIRED_KEYS = ("name", "url")
+SELECTOR_KEYS = ("container", "title", "link")
+
+def load_sources(path=None):
+    """Carga el registro de fuentes y aplica los valores por defecto a cada una.
+
+    Cada fuente es un dict con `name`, `url`, `base_url`, `selectors` (CSS para el
+    contenedor, el título y el enlace), `num_articles`, `max_listing_items`,
+    `max_concurrent` y `rate_limit` (peticiones por segundo al host, que se adapta
+    hasta `max_rate`; `robots: false` ignora el Crawl-delay de robots.txt). Opcionalmente,
+    `feed` (RSS/Atom) y `sitemap` (sitemap de noticias) se prefieren al listado HTML.
+    En modo servicio, `interval` y `jitter` (segundos) marcan cada cuánto se ejecuta.
+    Con `min_relevance`, solo se descargan los candidatos cuya puntuación de amenazas
+    (ver `relevance.relevance_score`) llega a ese valor; `relevance_terms` añade términos
+    propios de la fuente con su peso. Al cambiar cualquiera de los dos, la siguiente
+    ejecución vuelve a puntuar los candidatos filtrados.
+    """
+    path = path or os.environ.get("SCRAPER_SOURCES", SOURCES_PATH)
+    with open(path, encoding="utf-8") as f:
+        registry = json.load(f)
+
+    defaults = registry.get("defaults", {})
+    sources = []
+    names = set()
+    for entry in registry.get("sources", []):
+        missing = [key for key in REQUIRED_KEYS if not entry.get(key)]
+        if missing:
+            raise ValueError(f"Fuente sin {', '.join(missing)} en {path}: {entry}")
+        if entry["name"] in names:
+            raise ValueError(f"Fuente duplicada en {path}: {entry['name']}")
+        names.add(entry["name"])
+        if entry.get("enabled", True) is False:
+            continue
+
+        source = dict(defaults)
+        source.update(entry)
+        source["selectors"] = dict(defaults.get("selectors", {}), **entry.get("selectors", {}))
+        missing = [key for key in SELECTOR_KEYS if not source["selectors"].get(key)]
+        if missing:
+            raise ValueError(f"La fuente {entry['name']} no define los selectores {', '.join(missing)}")
+        source.setdefault("base_url", source["url"])
+        sources.append(source)
+
+    logging.info(f"{len(sources)} fuentes cargadas de {path}")
+    return sources
+
+def resolve_link(source, href):
+    """Convierte un enlace del listado en una URL absoluta."""
+    return urljoin(source.get("base_url", source["url"]), href)
+
+def source_host(source):
+    return urlparse(source["url"]).netloc
+
+def interleave_by_host(sources):
+    """Ordena las fuentes alternando hosts, para que ninguno acapare los primeros turnos."""
+    by_host = OrderedDict()
+    for source in sources:
+        by_host.setdefault(source_host(source), deque()).append(source)
+    ordered = []
+    while by_host:
+        for host in list(by_host):
+            ordered.append(by_host[host].popleft())
+            if not by_host[host]:
+                del by_host[host]
+    return ordered
@@ -0,0 +1,139 @@
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import Counter
+
+# Frases: corta tras . ! ? … seguido de espacio y de algo que parezca inicio de frase
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?…])\s+(?=[\"'«¿¡(]?[A-ZÁÉÍÓÚÑÜ0-9])")
+WORD_RE = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+STOPWORDS = frozenset("""
+a al algo algunas algunos ante antes como con contra cual cuando de del desde donde durante
+e el ella ellas ellos en entre era eran es esa esas ese eso esos esta estaba estado estan
+estas este esto estos fue fueron ha han hasta hay la las le les lo los mas me mi mientras muy
+nada ni no nos o os otra otras otro otros para pero poco por porque que quien se ser si sin
+sobre su sus tambien tanto te tiene tienen todo todos tu un una unas uno unos y ya yo
+the of and to in is that for on with as are was be by this it from at or an have has not
+""".split())
+
+def fold(text):
+    """Minúsculas y sin tildes, igual que `fold()` en index.html."""
+    decomposed = unicodedata.normalize("NFD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+def _words(text):
+    # Las palabras vacías están sin tildes: "más" o "también" también lo son
+    return [w for w in WORD_RE.findall(fold(text)) if len(w) > 2 and w not in STOPWORDS]
+
+def builtin_summarize(title, text, max_sentences=5):
+    """Resumen extractivo: elige las frases con más peso de términos frecuentes.
+
+    Cada frase puntúa por la frecuencia relativa de sus palabras en el texto, con un
+    extra por palabras del título y por aparecer al principio. Las frases elegidas se
+    devuelven en su orden original.
+    """
+    sentences = [s.strip() for s in SENTENCE_SPLIT_RE.split(text) if s.strip()]
+    if len(sentences) <= max_sentences:
+        return "\n".join(sentences)
+
+    frequencies = Counter(_words(text))
+    if not frequencies:
+        return "\n".join(sentences[:max_sentences])
+    top_frequency = frequencies.most_common(1)[0][1]
+    title_words = set(_words(title or ""))
+
+    scores = []
+    for position, sentence in enumerate(sentences):
+        words = _words(sentence)
+        if not words:
+            scores.append(0.0)
+            continue
+        term_score = sum(frequencies[w] for w in words) / (top_frequency * len(words))
+        title_score = len(title_words.intersection(words)) / len(title_words) if title_words else 0.0
+        position_score = 1.0 - position / len(sentences)
+        scores.append(term_score + 0.5 * title_score + 0.2 * position_score)
+
+    best = sorted(range(len(sentences)), key=scores.__getitem__, reverse=True)[:max_sentences]
+    return "\n".join(sentences[i] for i in sorted(best))
+
+def _ensure_nltk_data():
+    import nltk
+    for resource, package in (("corpora/wordnet", "wordnet"), ("tokenizers/punkt", "punkt"), ("tokenizers/punkt_tab/english.pickle", "punkt_tab")):
+        try:
+            nltk.data.find(resource)
+        except LookupError:
+            nltk.download(package, download_dir=os.environ.get("NLTK_DATA"))
+
+def newspaper_summarize(title, text, max_sentences=5):
+    """Resumen de newspaper3k (`Article.nlp()`). Necesita los datos de NLTK."""
+    _ensure_nltk_data()
+    from newspaper import nlp
+    nlp.load_stopwords("en")
+    return "\n".join(nlp.summarize(title=title or "", text=text, max_sents=max_sentences))
+
+SUMMARIZERS = {
+    "builtin": builtin_summarize,
+    "newspaper": newspaper_summarize,
+}
+
+class SummaryCache:
+    """Memoiza resúmenes por hash del contenido en un SQLite compartido entre procesos."""
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get("SUMMARY_CACHE_PATH", ".cache/summaries.sqlite")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._local = threading.local()
+
+    def _connection(self):
+        # Una conexión por hilo y por proceso: no se deben heredar conexiones tras un fork
+        pid, connection = getattr(self._local, "connection", (None, None))
+        if connection is None or pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("CREATE TABLE IF NOT EXISTS summaries (key TEXT PRIMARY KEY, summary TEXT NOT NULL)")
+            self._local.connection = (os.getpid(), connection)
+        return connection
+
+    def get(self, key):
+        row = self._connection().execute("SELECT summary FROM summaries WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, summary):
+        with self._connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO summaries (key, summary) VALUES (?, ?)", (key, summary))
+
+_cache = None
+
+def summarize(title, text, method=None, max_sentences=5, refresh=False):
+    """Resume `text` con el método configurado, reutilizando resúmenes ya calculados.
+
+    El método se elige con `method` o con la variable `SCRAPER_SUMMARIZER`
+    (por defecto `builtin`; ver `SUMMARIZERS`). Con `refresh` (o la variable
+    `SCRAPER_SUMMARY_CACHE=refresh`) no se leen los resúmenes guardados: se recalculan y
+    se sustituyen, por ejemplo al reprocesar el archivo tras cambiar el resumidor.
+    """
+    global _cache
+    method = method or os.environ.get("SCRAPER_SUMMARIZER", "builtin")
+    if method not in SUMMARIZERS:
+        raise ValueError(f"Resumidor desconocido: {method}")
+    if not text:
+        return ""
+    key = hashlib.sha256(f"{method}\0{max_sentences}\0{title}\0{text}".encode("utf-8")).hexdigest()
+    if _cache is None:
+        _cache = SummaryCache()
+    try:
+        cached = None if refresh or os.environ.get("SCRAPER_SUMMARY_CACHE") == "refresh" else _cache.get(key)
+    except sqlite3.Error as e:
+        logging.warning(f"No se pudo leer la caché de resúmenes: {e}")
+        cached = None
+    if cached is not None:
+        return cached
+    summary = SUMMARIZERS[method](title, text, max_sentences=max_sentences)
+    try:
+        _cache.set(key, summary)
+    except sqlite3.Error as e:
+        logging.warning(f"No se pudo guardar el resumen en caché: {e}")
+    return summary
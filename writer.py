@@ -0,0 +1,111 @@
+import logging
+import random
+import time
+
+from metrics import metrics
+
+class BulkWriter:
+    """Acumula filas y las escribe en Supabase como upserts por lotes.
+
+    El lote se vacía al alcanzar `batch_size` filas o cuando han pasado `flush_interval`
+    segundos desde el último vaciado. Los errores de red se reintentan con espera
+    exponencial; si PostgREST rechaza un lote, se divide en mitades hasta aislar las filas
+    problemáticas, que quedan en `failed` con su error sin perder el resto del lote.
+
+    `client` solo necesita exponer `table(nombre).upsert(...).execute()`, así que sirve
+    tanto el cliente de Supabase como uno apuntando a un PostgREST local. Si se indica,
+    `on_written` recibe cada lote escrito (por ejemplo, `NdjsonSink.write_many`). Con
+    `ignore_duplicates=False` las filas existentes se actualizan en lugar de omitirse.
+    Si la tabla no tiene índice único en `on_conflict`, con `ignore_duplicates=True` se
+    pasa a inserciones simples (los duplicados los evita entonces solo el índice de
+    duplicados del scraper); con `ignore_duplicates=False` insertar duplicaría las filas
+    que había que actualizar, así que los lotes fallan.
+    """
+
+    def __init__(self, client, table="amenazas", on_conflict="enlace", batch_size=50, flush_interval=10.0, max_retries=3, backoff=1.0, source="", on_written=None, ignore_duplicates=True):
+        self.client = client
+        self.ignore_duplicates = ignore_duplicates
+        self.source = source
+        self.on_written = on_written
+        self.table = table
+        self.on_conflict = on_conflict
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.buffer = []
+        self.failed = []
+        self.written = 0
+        self._last_flush = time.monotonic()
+        self._reported = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def add(self, row):
+        """Añade una fila al lote y lo vacía si se supera algún umbral."""
+        self.buffer.append(row)
+        if len(self.buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Escribe todas las filas pendientes."""
+        rows, self.buffer = self.buffer, []
+        self._last_flush = time.monotonic()
+        if rows:
+            self._write(rows)
+
+    def close(self):
+        """Vacía lo pendiente y devuelve la lista de `(fila, error)` que no se pudieron escribir."""
+        self.flush()
+        if len(self.failed) > self._reported:
+            logging.warning(f"{len(self.failed)} filas no se pudieron escribir en '{self.table}'.")
+            self._reported = len(self.failed)
+        return self.failed
+
+    def _upsert(self, rows):
+        for attempt in range(self.max_retries):
+            try:
+                if self.on_conflict is None:
+                    self.client.table(self.table).insert(rows, returning="minimal").execute()
+                else:
+                    self.client.table(self.table).upsert(rows, on_conflict=self.on_conflict, ignore_duplicates=self.ignore_duplicates, returning="minimal").execute()
+                return
+            except Exception as e:
+                if getattr(e, "code", None) == "42P10" and self.on_conflict is not None:
+                    # Sin índice único en la columna no hay upsert posible
+                    if not self.ignore_duplicates:
+                        raise RuntimeError(f"'{self.table}' no tiene un índice único en '{self.on_conflict}' y sin él no se pueden actualizar filas. Aplica migrations/000_amenazas_enlace_unique.sql.") from e
+                    logging.warning(f"'{self.table}' no tiene un índice único en '{self.on_conflict}' (ver migrations/000_amenazas_enlace_unique.sql). Se insertan las filas sin upsert.")
+                    self.on_conflict = None
+                    return self._upsert(rows)
+                # Los errores de PostgREST traen un código SQL: reintentar no los arregla
+                if getattr(e, "code", None) or attempt == self.max_retries - 1:
+                    raise
+                delay = self.backoff * (2 ** attempt) + random.random()
+                logging.warning(f"Intento {attempt + 1} de escritura fallido: {e}. Reintentando en {delay:.2f} s...")
+                time.sleep(delay)
+
+    def _write(self, rows):
+        try:
+            with metrics.time("insert", self.source):
+                self._upsert(rows)
+        except Exception as e:
+            # Sin código SQL el fallo es de red: dividir el lote no ayudaría
+            if len(rows) == 1 or not getattr(e, "code", None):
+                logging.error(f"Error al escribir {len(rows)} filas en '{self.table}': {e}")
+                self.failed.extend((row, e) for row in rows)
+                metrics.incr("rows_failed", self.source, len(rows))
+                return
+            middle = len(rows) // 2
+            self._write(rows[:middle])
+            self._write(rows[middle:])
+            return
+        self.written += len(rows)
+        metrics.incr("rows_written", self.source, len(rows))
+        logging.info(f"Lote de {len(rows)} filas escrito en '{self.table}'.")
+        if self.on_written is not None:
+            self.on_written(rows)